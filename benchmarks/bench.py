@@ -0,0 +1,354 @@
+"""
+Micro-benchmarks for the game engine and the bots
+(commands for running them and comparing results)
+
+Every operation is timed on a fixed corpus of positions, built by
+playing seeded random moves on boards of 4 to 20 squares per side
+with 2 to 9 players. Results are written as JSON:
+
+    {"corpus": [...], "results": {OP: {"ns_per_op": ..., ...}}}
+
+For each operation, "ns_per_op" is the mean time of one call over the
+corpus, "allocations" is the mean number of memory blocks allocated
+by a call and still alive when it returns (including its result), and
+"peak_bytes" is the largest amount of memory a call used while it ran
+(both measured with tracemalloc, in a separate, untimed pass).
+
+The "imports" command measures the cold start of the command-line
+entry points instead: the cumulative time reported by
+python -X importtime for importing each module (best of several
+runs, in microseconds), and the number of modules it loads.
+
+Usage:
+    python benchmarks/bench.py run -o results.json
+    python benchmarks/bench.py imports -o imports.json
+    python benchmarks/bench.py compare old.json new.json
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import click
+
+SRC: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "src")
+sys.path.insert(0, SRC)
+
+from reversi import Reversi  # pylint: disable=wrong-import-position
+from bot import RandomBot, SmartBot, VerySmartBot  # pylint: disable=wrong-import-position
+
+Config = Tuple[int, int, bool]
+Setup = Callable[[Reversi], Tuple[Any, ...]]
+Op = Callable[..., Any]
+
+CONFIGS: List[Config] = [(4, 2, True), (5, 3, False), (6, 4, False),
+                         (7, 5, False), (8, 2, True), (9, 9, False),
+                         (10, 6, False), (12, 8, False), (15, 7, False),
+                         (20, 2, True)]
+"""
+Board size, number of players and Othello setting of the corpus games
+"""
+
+
+def build_corpus(seed: int = 0) -> List[Tuple[Config, Reversi]]:
+    """
+    Builds the corpus of positions: for every configuration, the
+    positions reached after a quarter, half and three quarters of the
+    squares are filled by random moves (skipping finished games).
+
+    Args:
+        seed: seed for the random moves
+    Returns: the positions, with their configuration
+    """
+    rng: random.Random = random.Random(seed)
+    corpus: List[Tuple[Config, Reversi]] = []
+    for config in CONFIGS:
+        side, players, othello = config
+        game: Reversi = Reversi(side, players, othello)
+        filled: int = 4 if othello else 0
+        for fraction in (0.25, 0.5, 0.75):
+            while filled < side * side * fraction and not game.done:
+                game.apply_move(rng.choice(game.available_moves))
+                filled += 1
+            if game.done:
+                break
+            corpus.append((config, deepcopy(game)))
+    return corpus
+
+
+def seeded(bot: Callable[[Reversi], Any]) -> Op:
+    """
+    Returns: an operation asking a bot for a move, with the random
+    number generator reset so every run breaks ties the same way
+    """
+    def suggest_move(game: Reversi) -> Any:
+        random.seed(0)
+        return bot(game).suggest_move()
+    return suggest_move
+
+
+def first_move(game: Reversi) -> Tuple[Any, ...]:
+    """
+    Returns: the arguments (game, move) for the first legal move
+    """
+    return (game, game.available_moves[0])
+
+
+OPS: Dict[str, Tuple[Setup, Op]] = {
+    "legal_move": (first_move, lambda g, m: g.legal_move(m)),
+    "available_moves": (lambda g: (g,), lambda g: g.available_moves),
+    "captures": (first_move, lambda g, m: g.captures(m)),
+    "apply_move": (lambda g: (deepcopy(g), g.available_moves[0]),
+                   lambda g, m: g.apply_move(m)),
+    "simulate_moves": (lambda g: (g, [g.available_moves[0]]),
+                       lambda g, ms: g.simulate_moves(ms)),
+    "load_game": (lambda g: (Reversi(g.size, g.num_players, False),
+                             g.turn, g.grid),
+                  lambda target, turn, grid: target.load_game(turn, grid)),
+    "grid": (lambda g: (g,), lambda g: g.grid),
+    "board_str": (lambda g: (g._board,),  # pylint: disable=protected-access
+                  str),
+    "random_bot": (lambda g: (g,), seeded(RandomBot)),
+    "smart_bot": (lambda g: (g,), seeded(SmartBot)),
+    "very_smart_bot": (lambda g: (g,), seeded(VerySmartBot)),
+}
+"""
+Benchmarked operations: a setup function building the arguments of
+each call (not timed) and the operation itself
+"""
+
+
+def time_op(setup: Setup, op: Op, positions: List[Reversi],
+            min_time: float) -> Tuple[float, int]:
+    """
+    Times an operation on a list of positions, repeating the whole
+    list until at least min_time seconds have been measured.
+
+    Returns: the mean time of a call (in nanoseconds), and the number
+    of calls
+    """
+    total: int = 0
+    calls: int = 0
+    while total < min_time * 1e9 or calls == 0:
+        args: List[Tuple[Any, ...]] = [setup(game) for game in positions]
+        start: int = time.perf_counter_ns()
+        for arg in args:
+            op(*arg)
+        total += time.perf_counter_ns() - start
+        calls += len(args)
+    return total / calls, calls
+
+
+def measure_memory(setup: Setup, op: Op,
+                   positions: List[Reversi]) -> Tuple[float, float]:
+    """
+    Measures the memory used by an operation with tracemalloc.
+
+    Returns: the mean number of blocks allocated by a call that are
+    still alive when it returns, and the mean peak memory of a call
+    (in bytes)
+    """
+    args: List[Tuple[Any, ...]] = [setup(game) for game in positions]
+    results: List[Any] = []
+    blocks: int = 0
+    peak: int = 0
+    tracemalloc.start()
+    try:
+        for arg in args:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            results.append(op(*arg))
+            _, high = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            peak += high - base
+            blocks += sum(max(stat.count_diff, 0) for stat in
+                          after.compare_to(before, "traceback"))
+    finally:
+        tracemalloc.stop()
+    return blocks / len(args), peak / len(args)
+
+
+def run_benchmarks(ops: Optional[List[str]] = None, min_time: float = 0.2,
+                   seed: int = 0) -> Dict[str, Any]:
+    """
+    Runs the benchmarks.
+
+    Args:
+        ops: names of the operations to run (defaults to all of them)
+        min_time: seconds to spend timing each operation
+        seed: seed used to build the corpus
+    Returns: the results, ready to be written as JSON
+    """
+    corpus: List[Tuple[Config, Reversi]] = build_corpus(seed)
+    positions: List[Reversi] = [game for _, game in corpus]
+    results: Dict[str, Dict[str, float]] = {}
+    for name in ops or list(OPS):
+        setup, op = OPS[name]
+        ns_per_op, calls = time_op(setup, op, positions, min_time)
+        allocations, peak = measure_memory(setup, op, positions)
+        results[name] = {"ns_per_op": ns_per_op, "calls": calls,
+                         "allocations": allocations, "peak_bytes": peak}
+    return {"python": platform.python_version(),
+            "seed": seed,
+            "corpus": [list(config) for config, _ in corpus],
+            "results": results}
+
+
+ENTRY_POINTS: List[str] = ["reversi", "bot", "tui", "gui", "server"]
+"""
+Modules whose import time is measured
+"""
+
+
+def import_profile(module: str) -> Dict[str, int]:
+    """
+    Imports a module in a new interpreter with -X importtime.
+
+    Returns: the time each module took to import, including the
+    modules it imported (in microseconds), by module name
+    """
+    env: Dict[str, str] = dict(os.environ, PYTHONPATH=SRC)
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, check=True, capture_output=True, text=True).stderr
+    times: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def run_imports(modules: Optional[List[str]] = None,
+                repeat: int = 5) -> Dict[str, Any]:
+    """
+    Measures the import time of the entry points.
+
+    Args:
+        modules: modules to import (defaults to ENTRY_POINTS)
+        repeat: number of runs (the fastest one counts)
+    Returns: the results, ready to be written as JSON
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for module in modules or ENTRY_POINTS:
+        runs: List[Dict[str, int]] = [import_profile(module)
+                                      for _ in range(repeat)]
+        results[f"import {module}"] = {
+            "import_us": min(run[module] for run in runs),
+            "modules": len(runs[0])}
+    return {"python": platform.python_version(), "results": results}
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any],
+                    threshold: float = 0.1) \
+        -> List[Tuple[str, str, float, float, bool]]:
+    """
+    Compares two benchmark results.
+
+    Args:
+        old: the baseline results
+        new: the results to check
+        threshold: relative increase above which a metric is flagged
+        as a regression (0.1 is 10%)
+    Returns: for every metric of every operation in both results
+    (except the number of calls), (operation, metric, old value,
+    new value, regressed)
+    """
+    rows: List[Tuple[str, str, float, float, bool]] = []
+    for name, new_row in new["results"].items():
+        old_row: Optional[Dict[str, float]] = old["results"].get(name)
+        if old_row is None:
+            continue
+        for metric in new_row:
+            if metric == "calls" or metric not in old_row:
+                continue
+            before: float = old_row[metric]
+            after: float = new_row[metric]
+            regressed: bool = after > before * (1 + threshold) and \
+                after - before > 1e-9
+            rows.append((name, metric, before, after, regressed))
+    return rows
+
+
+@click.group("bench")
+def main() -> None:
+    """
+    Micro-benchmarks for the game engine and the bots.
+    """
+
+
+@main.command("run")
+@click.option("--op", "ops", multiple=True, type=click.Choice(list(OPS)),
+              help="Operation to run (may be repeated; default: all)")
+@click.option("--min-time", type=float, default=0.2,
+              help="Seconds to spend timing each operation")
+@click.option("--seed", type=int, default=0)
+@click.option("-o", "--output", type=click.Path(dir_okay=False),
+              default=None, help="Write the results to a JSON file")
+def run(ops: Tuple[str, ...], min_time: float, seed: int,
+        output: Optional[str]) -> None:
+    results: Dict[str, Any] = run_benchmarks(list(ops), min_time, seed)
+    print(f"{len(results['corpus'])} positions")
+    print()
+    print("Operation                ns/op   allocations   peak bytes")
+    for name, row in results["results"].items():
+        print(f"{name:<16}{row['ns_per_op']:>13.0f}" +
+              f"{row['allocations']:>14.1f}{row['peak_bytes']:>13.0f}")
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+@main.command("imports")
+@click.option("--module", "modules", multiple=True,
+              help="Module to import (may be repeated; default: the " +
+              "command-line entry points)")
+@click.option("--repeat", type=int, default=5)
+@click.option("-o", "--output", type=click.Path(dir_okay=False),
+              default=None, help="Write the results to a JSON file")
+def imports(modules: Tuple[str, ...], repeat: int,
+            output: Optional[str]) -> None:
+    results: Dict[str, Any] = run_imports(list(modules), repeat)
+    print("Module                 import (ms)    modules")
+    for name, row in results["results"].items():
+        print(f"{name:<22}{row['import_us'] / 1000:>12.1f}" +
+              f"{row['modules']:>11}")
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+@main.command("compare")
+@click.argument("old", type=click.Path(exists=True, dir_okay=False))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False))
+@click.option("-t", "--threshold", type=float, default=0.1,
+              help="Relative increase flagged as a regression")
+def compare(old: str, new: str, threshold: float) -> None:
+    with open(old, encoding="utf-8") as f:
+        old_results: Dict[str, Any] = json.load(f)
+    with open(new, encoding="utf-8") as f:
+        new_results: Dict[str, Any] = json.load(f)
+    rows = compare_results(old_results, new_results, threshold)
+    print("Operation       metric                old          new   change")
+    for name, metric, before, after, regressed in rows:
+        change: str = f"{(after / before - 1) * 100:+7.1f}%" if before \
+            else f"{'-':>8}"
+        print(f"{name:<16}{metric:<12}{before:>13.1f}{after:>13.1f} " +
+              change + ("  REGRESSION" if regressed else ""))
+    if any(regressed for *_, regressed in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
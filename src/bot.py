@@ -4,14 +4,12 @@ Bots for Reversi
 """
 
 import random
-import sys
-from typing import Union, Tuple, Optional, List
+from typing import Union, Tuple, Optional, List, Dict, Iterator
 import click
 import time
 
-
-from mocks import ReversiStub, ReversiBotMock
 from reversi import Reversi, Piece, Board, ReversiBase
+from profiling import profile, profile_option
 
 
 #
@@ -93,41 +91,48 @@ class VerySmartBot:
 
         Returns: None
 
-        """   
-        
-        def find_average(list):
-            sum = 0
-            for num in list:
-                sum += num
-            return sum / (len(list))
+        """
+        for move in self.search():
+            pass
+        return move
+
+    def search(self) -> Iterator[Tuple[int, int]]:
+        """ Searches for a move, anytime-style
+
+        Yields the best move found so far after each candidate move is
+        evaluated, so the search can be stopped early. The last move
+        yielded is the suggested move.
 
+        Returns: an iterator over the best move found so far
+        """
         moves = self._reversi.available_moves
         player = self._reversi.turn
-        dif_values = []
+        dif_values: List[float] = []
         for move1 in moves:
             sim_game: Reversi = self._reversi.simulate_moves([move1])
             
             #check if move1 wins the game
             winners = sim_game.outcome
             if len(winners) == 1 and winners[0] == player:
-                return move1
+                yield move1
+                return
             
             #maximize value
             #we count the pieces captured by move1 and move2
             # not the total number of pieces on the board
+            captures1: int = len(self._reversi.captures(move1))
             piece_count_difs: List[int] = []
             for move2 in sim_game.available_moves:
-                captures1: int = len(self._reversi.captures(move1))
                 captures2: int = len(sim_game.captures(move2, [player]))
-                dif: int = captures1 - captures2
-                piece_count_difs.append(dif)
-            dif_values.append(find_average(piece_count_difs))
+                piece_count_difs.append(captures1 - captures2)
+            dif_values.append(sum(piece_count_difs) / len(piece_count_difs))
+            yield moves[dif_values.index(max(dif_values))]
         max_value = max(dif_values)
         optimal_moves = []
         for i, x in enumerate(dif_values):
             if x == max_value:
                 optimal_moves.append(moves[i])
-        return random.choice(optimal_moves)
+        yield random.choice(optimal_moves)
 
 class ReversiBot:
     """
@@ -139,6 +144,8 @@ class ReversiBot:
     smart: SmartBot
     very_smart: VerySmartBot
 
+    _decision: Optional[Tuple[Tuple[int, str], Tuple[int, int]]]
+
     def __init__(self, reversi: Reversi) -> None:
         """
         Constructor
@@ -154,29 +161,162 @@ class ReversiBot:
         self.rand = RandomBot(reversi)
         self.smart = SmartBot(reversi)
         self.very_smart = VerySmartBot(reversi)
+        self._decision = None
 
     def hint(self, bot: str) -> Tuple[int, int]:
+        """
+        Returns the move the given bot chooses in the current position.
+        The last decision is remembered (keyed by position hash and
+        strategy), so asking again before the board changes returns the
+        same move without searching again.
+        """
+        key: Tuple[int, str] = (self.game.position_hash(), bot)
+        if self._decision is not None and self._decision[0] == key:
+            return self._decision[1]
         if bot == "random":
             suggested_move: Tuple[int, int] = self.rand.suggest_move()
         if bot == "smart":
             suggested_move = self.smart.suggest_move()
         if bot == "very-smart":
             suggested_move = self.very_smart.suggest_move()
+        self._decision = (key, suggested_move)
         return suggested_move
     
     def move(self, bot: str) -> None:
-        self.game.apply_move(self.hint(bot))
+        """
+        Applies the move the given bot chooses (the one returned by the
+        last hint, if the board has not changed since).
+        """
+        move: Tuple[int, int] = self.hint(bot)
+        self._decision = None
+        self.game.apply_move(move)
 
     
-def play_game(bot1: str, bot2: str, game: Reversi) -> list[int]:
+class SimulationStats:
+    """
+    Per-move think times and game lengths recorded while simulating games
+    """
+
+    move_times: List[Tuple[int, int, str, float]]
+    game_lengths: List[int]
+    elapsed: float
+
+    def __init__(self) -> None:
+        """
+        Constructor
+
+        Attributes:
+            move_times: (game, ply, strategy, seconds) for every move
+            game_lengths: number of moves in every game
+            elapsed: total wall-clock time of the simulation, in seconds
+        """
+        self.move_times = []
+        self.game_lengths = []
+        self.elapsed = 0.0
+
+    def record_move(self, ply: int, strategy: str, seconds: float) -> None:
+        """
+        Records the time a bot took to choose a move in the current game
+        """
+        self.move_times.append((len(self.game_lengths), ply, strategy,
+                                seconds))
+
+    def record_game(self, length: int) -> None:
+        """
+        Records the end of a game and its number of moves
+        """
+        self.game_lengths.append(length)
+
+    def times_by_strategy(self) -> Dict[str, List[float]]:
+        """
+        Returns: the recorded think times, grouped by strategy
+        """
+        times: Dict[str, List[float]] = {}
+        for _, _, strategy, seconds in self.move_times:
+            times.setdefault(strategy, []).append(seconds)
+        return times
+
+    def print_report(self, ply_bucket: int = 10) -> None:
+        """
+        Print latency percentiles per strategy and per game phase,
+        throughput and a histogram of game lengths
+
+        Args:
+            ply_bucket: number of plies in each row of the per-phase table
+        """
+        num_games = len(self.game_lengths)
+        if self.elapsed > 0:
+            print (f"Games per second: {num_games / self.elapsed:.2f}")
+        print ()
+        print ("Think time (ms)     p50      p90      p99      max")
+        for strategy, times in sorted(self.times_by_strategy().items()):
+            row = [percentile(times, q) * 1000 for q in (50, 90, 99, 100)]
+            print (f"{strategy:<12}" + "".join(f"{t:9.3f}" for t in row))
+
+        print ()
+        print ("p90 think time (ms) by ply")
+        strategies = sorted(self.times_by_strategy())
+        print ("plies     " + "".join(f"{s:>12}" for s in strategies))
+        buckets: Dict[Tuple[int, str], List[float]] = {}
+        for _, ply, strategy, seconds in self.move_times:
+            buckets.setdefault((ply // ply_bucket, strategy), []).append(seconds)
+        for bucket in sorted({b for b, _ in buckets}):
+            first = bucket * ply_bucket
+            row_str = f"{first:>3}-{first + ply_bucket - 1:<3}   "
+            for strategy in strategies:
+                times = buckets.get((bucket, strategy), [])
+                row_str += f"{percentile(times, 90) * 1000:12.3f}" \
+                    if times else f"{'-':>12}"
+            print (row_str)
+
+        print ()
+        print ("Game length histogram")
+        counts: Dict[int, int] = {}
+        for length in self.game_lengths:
+            counts[length] = counts.get(length, 0) + 1
+        most = max(counts.values(), default=0)
+        for length in sorted(counts):
+            bar = "#" * max(1, round(40 * counts[length] / most))
+            print (f"{length:>4} {counts[length]:>6} {bar}")
+
+    def dump(self, path: str) -> None:
+        """
+        Write the raw think times to a CSV file
+
+        Args:
+            path: name of the file to write
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("game,ply,strategy,seconds\n")
+            for game, ply, strategy, seconds in self.move_times:
+                f.write(f"{game},{ply},{strategy},{seconds:.9f}\n")
+
+
+def percentile(values: List[float], q: float) -> float:
     """
-    Play one singular game of ReversiStub which ends when either 4 moves have
-    been taken or a player hits (0,0)
+    Nearest-rank percentile of a list of values
+
+    Args:
+        values: the values (need not be sorted)
+        q: the percentile, between 0 and 100
+    Returns: the smallest value such that at least q% of the values are
+    less than or equal to it
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def play_game(bot1: str, bot2: str, game: Reversi,
+              stats: Optional[SimulationStats] = None) -> list[int]:
+    """
+    Play one game between two bots, until the game is over
 
     Args:
         player1: the first player of the game
         player2: the second player of the game
         game: the board that keeps track of the moves
+        stats: if given, records the time each move took to choose
     
     Returns
         the outcome of game, whether it was a draw, win by player1 or win by
@@ -184,11 +324,19 @@ def play_game(bot1: str, bot2: str, game: Reversi) -> list[int]:
     """
 
     game_bot: ReversiBot = ReversiBot(game)
+    ply = 0
     while not (len(game.outcome) == 1 or len(game.outcome) == 2):
-        if game.turn == 1:
-            game_bot.move(bot1)
-        elif game.turn == 2:
-            game_bot.move(bot2)
+        bot = bot1 if game.turn == 1 else bot2
+        if stats is None:
+            game_bot.move(bot)
+        else:
+            start = time.perf_counter()
+            move = game_bot.hint(bot)
+            stats.record_move(ply, bot, time.perf_counter() - start)
+            game.apply_move(move)
+        ply += 1
+    if stats is not None:
+        stats.record_game(ply)
     return game.outcome 
     
 
@@ -198,22 +346,54 @@ def play_game(bot1: str, bot2: str, game: Reversi) -> list[int]:
     type=click.Choice(['random', 'smart', 'very-smart']), default='random')
 @click.option('-2', '--player2', \
     type=click.Choice(['random', 'smart', 'very-smart']), default='random')
-
-def main(num_games: int, player1: str, player2: str):
-    play_num_games(num_games, player1, player2)
-
-def play_num_games(numgames: int, player1: str, player2: str) -> None:
+@click.option('--latency', is_flag=True,
+              help="Report per-move think times and game lengths")
+@click.option('--dump-timings', type=click.Path(dir_okay=False),
+              default=None, help="Write raw think times to a CSV file")
+@profile_option
+def main(num_games: int, player1: str, player2: str, latency: bool,
+         dump_timings: Optional[str], profile_path: Optional[str]):
+    stats: Optional[SimulationStats] = None
+    if latency or dump_timings is not None:
+        stats = SimulationStats()
+    with profile(profile_path):
+        play_num_games(num_games, player1, player2, stats)
+    if stats is not None:
+        print ()
+        stats.print_report()
+        if dump_timings is not None:
+            stats.dump(dump_timings)
+
+def play_num_games(numgames: int, player1: str, player2: str,
+                   stats: Optional[SimulationStats] = None) -> None:
     """
     Play a specific number of Reversi games specified by the user
 
     Args:
         numgames: the amount of times the game should be played
+        stats: if given, records think times and game lengths
     """
+    results: List[List[int]] = []
+    start = time.perf_counter()
+    for i in range(numgames):
+        results.append(play_game(player1, player2, Reversi(8, 2, True),
+                                 stats))
+    if stats is not None:
+        stats.elapsed = time.perf_counter() - start
+    print_results(results)
+
+def print_results(results: List[List[int]]) -> None:
+    """
+    Print the percentage of games won by each player, and of ties
+
+    Args:
+        results: the outcome of each game that was played
+    """
+    numgames = len(results)
     player1_wins = 0
     player2_wins = 0
     draws = 0
-    for i in range(numgames):
-        result = play_game(player1, player2, Reversi(8, 2, True))
+    for result in results:
         if len (result) == 1:  
             if result[0] == 1:
                 player1_wins += 1
@@ -0,0 +1,351 @@
+"""
+Distributed bot simulations
+(coordinator and worker commands)
+
+A coordinator splits the games to play into seed ranges and hands
+them out to workers over TCP. Workers play the games in each range
+with play_game and stream back one result record per game. Every
+message is one JSON object per line.
+
+Messages from a worker:
+    {"type": "hello", "worker": NAME}
+    {"type": "heartbeat"}
+    {"type": "result", "task": ID, "seed": SEED, "winners": [...]}
+    {"type": "finished", "task": ID}
+
+Messages from the coordinator:
+    {"type": "task", "task": ID, "player1": S1, "player2": S2,
+     "seed": FIRST_SEED, "count": NUM_GAMES}
+    {"type": "done"}
+
+If a worker disconnects, or stops sending heartbeats, the seeds it
+has not reported yet are put back in the queue for another worker.
+Since every game is seeded, the results do not depend on which
+worker played them.
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import click
+
+from reversi import Reversi
+from bot import play_game, print_results
+
+StrategyPair = Tuple[str, str]
+
+
+def play_seeded_game(player1: str, player2: str, seed: int) -> List[int]:
+    """
+    Play one game of 8x8 Othello between two bot strategies, with the
+    random number generator seeded so that the game can be replayed.
+
+    Args:
+        player1: strategy of player 1
+        player2: strategy of player 2
+        seed: seed for the random number generator
+    Returns: the outcome of the game
+    """
+    random.seed(seed)
+    return play_game(player1, player2, Reversi(8, 2, True))
+
+
+class SeedRange:
+    """
+    A range of consecutive seeds to play with one pair of strategies.
+    """
+
+    task_id: int
+    pair: int
+    start: int
+    end: int
+    next_seed: int
+
+    def __init__(self, task_id: int, pair: int, start: int, end: int):
+        """
+        Constructor
+
+        Args:
+            task_id: identifier sent to the worker
+            pair: index of the strategy pair to play
+            start: first seed of the range
+            end: one past the last seed of the range
+        """
+        self.task_id = task_id
+        self.pair = pair
+        self.start = start
+        self.end = end
+        self.next_seed = start
+
+
+class Coordinator:
+    """
+    Hands out seed ranges to workers and collects their results.
+    """
+
+    pairs: List[StrategyPair]
+    num_games: int
+    heartbeat_timeout: float
+    results: List[Dict[int, List[int]]]
+    port: int
+
+    _queue: Deque[SeedRange]
+    _next_task_id: int
+    _changed: asyncio.Condition
+    _handlers: Set[asyncio.Task]
+
+    def __init__(self, pairs: List[StrategyPair], num_games: int,
+                 chunk_size: int = 10, heartbeat_timeout: float = 10.0):
+        """
+        Constructor
+
+        Args:
+            pairs: strategy pairs (player 1, player 2) to simulate
+            num_games: number of games to play for each pair
+            chunk_size: number of seeds per range handed to a worker
+            heartbeat_timeout: seconds of silence after which a
+            worker is considered lost
+        """
+        self.pairs = pairs
+        self.num_games = num_games
+        self.heartbeat_timeout = heartbeat_timeout
+        self.results = [{} for _ in pairs]
+        self.port = 0
+        self._queue = deque()
+        self._next_task_id = 0
+        self._handlers = set()
+        for pair in range(len(pairs)):
+            for start in range(0, num_games, chunk_size):
+                self._enqueue(pair, start, min(start + chunk_size, num_games))
+
+    @property
+    def finished(self) -> bool:
+        """
+        Returns True once every game has been reported.
+        """
+        return all(len(pair_results) == self.num_games
+                   for pair_results in self.results)
+
+    def _enqueue(self, pair: int, start: int, end: int) -> None:
+        """
+        Adds a seed range to the queue of ranges to hand out.
+        """
+        self._queue.append(SeedRange(self._next_task_id, pair, start, end))
+        self._next_task_id += 1
+
+    async def _next_range(self) -> Optional[SeedRange]:
+        """
+        Waits for a seed range to hand out.
+
+        Returns: the range, or None if every game has been reported
+        """
+        async with self._changed:
+            while not self._queue and not self.finished:
+                await self._changed.wait()
+            if self.finished:
+                return None
+            return self._queue.popleft()
+
+    async def _release(self, seeds: SeedRange) -> None:
+        """
+        Puts the unreported seeds of a lost range back in the queue.
+        """
+        async with self._changed:
+            unreported: List[int] = [
+                seed for seed in range(seeds.next_seed, seeds.end)
+                if seed not in self.results[seeds.pair]]
+            if unreported:
+                self._enqueue(seeds.pair, unreported[0], unreported[-1] + 1)
+            self._changed.notify_all()
+
+    async def _record(self, seeds: SeedRange, seed: int,
+                      winners: List[int]) -> None:
+        """
+        Records the result of one game.
+        """
+        async with self._changed:
+            self.results[seeds.pair].setdefault(seed, winners)
+            seeds.next_seed = max(seeds.next_seed, seed + 1)
+            if self.finished:
+                self._changed.notify_all()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one worker connection.
+        """
+        seeds: Optional[SeedRange] = None
+        handler: Optional[asyncio.Task] = asyncio.current_task()
+        if handler is not None:
+            self._handlers.add(handler)
+        try:
+            await asyncio.wait_for(reader.readline(), self.heartbeat_timeout)
+            while True:
+                seeds = await self._next_range()
+                if seeds is None:
+                    writer.write(b'{"type": "done"}\n')
+                    await writer.drain()
+                    return
+                player1, player2 = self.pairs[seeds.pair]
+                message = {"type": "task", "task": seeds.task_id,
+                           "player1": player1, "player2": player2,
+                           "seed": seeds.start,
+                           "count": seeds.end - seeds.start}
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+                while True:
+                    line: bytes = await asyncio.wait_for(
+                        reader.readline(), self.heartbeat_timeout)
+                    if not line:
+                        raise ConnectionError("worker disconnected")
+                    record = json.loads(line)
+                    if record["type"] == "result":
+                        await self._record(seeds, record["seed"],
+                                           record["winners"])
+                    elif record["type"] == "finished":
+                        break
+                seeds = None
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            if seeds is not None:
+                await self._release(seeds)
+            writer.close()
+            self._handlers.discard(handler)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0,
+                    on_ready: Optional[Callable[[int], None]] = None) \
+            -> List[Dict[int, List[int]]]:
+        """
+        Accepts workers until every game has been reported.
+
+        Args:
+            host: address to listen on
+            port: port to listen on (0 picks a free port)
+            on_ready: called with the port once the coordinator listens
+        Returns: for each strategy pair, the outcome of each game,
+        by seed
+        """
+        self._changed = asyncio.Condition()
+        server = await asyncio.start_server(self._handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        if on_ready is not None:
+            on_ready(self.port)
+        async with server:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.finished)
+            #give idle workers a chance to receive "done"
+            if self._handlers:
+                await asyncio.wait(list(self._handlers), timeout=1.0)
+        return self.results
+
+
+def run_worker(host: str, port: int, heartbeat_interval: float = 1.0) -> int:
+    """
+    Connects to a coordinator and plays the games it hands out
+    until it reports that everything is done.
+
+    Args:
+        host: address of the coordinator
+        port: port of the coordinator
+        heartbeat_interval: seconds between heartbeats
+    Returns: the number of games played
+    """
+    sock: socket.socket = socket.create_connection((host, port))
+    lock: threading.Lock = threading.Lock()
+    stop: threading.Event = threading.Event()
+
+    def send(message: Dict) -> None:
+        with lock:
+            sock.sendall(json.dumps(message).encode() + b"\n")
+
+    def heartbeat() -> None:
+        while not stop.wait(heartbeat_interval):
+            try:
+                send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    games_played: int = 0
+    beater: threading.Thread = threading.Thread(target=heartbeat, daemon=True)
+    try:
+        send({"type": "hello", "worker": f"{socket.gethostname()}:" +
+              f"{os.getpid()}"})
+        beater.start()
+        with sock.makefile("rb") as lines:
+            for line in lines:
+                task = json.loads(line)
+                if task["type"] == "done":
+                    break
+                for seed in range(task["seed"], task["seed"] + task["count"]):
+                    winners: List[int] = play_seeded_game(
+                        task["player1"], task["player2"], seed)
+                    send({"type": "result", "task": task["task"],
+                          "seed": seed, "winners": winners})
+                    games_played += 1
+                send({"type": "finished", "task": task["task"]})
+    except ConnectionError:
+        #the coordinator stops once every game has been reported
+        pass
+    finally:
+        stop.set()
+        sock.close()
+    return games_played
+
+
+@click.group("distributed")
+def main() -> None:
+    """
+    Run bot simulations across several worker processes or nodes.
+    """
+
+
+@main.command("coordinator")
+@click.option('-n', '--num-games', type=int, default=100)
+@click.option('-p', '--pair', multiple=True,
+              help="Strategy pair as PLAYER1:PLAYER2 (may be repeated)")
+@click.option('--host', default="127.0.0.1")
+@click.option('--port', type=int, default=5555)
+@click.option('--chunk-size', type=int, default=10)
+@click.option('--heartbeat-timeout', type=float, default=10.0)
+def coordinator(num_games: int, pair: Tuple[str, ...], host: str, port: int,
+                chunk_size: int, heartbeat_timeout: float) -> None:
+    strategies: List[str] = ['random', 'smart', 'very-smart']
+    pairs: List[StrategyPair] = []
+    for spec in pair or ("random:random",):
+        player1, _, player2 = spec.partition(":")
+        if player1 not in strategies or player2 not in strategies:
+            raise click.BadParameter(f"invalid strategy pair {spec}")
+        pairs.append((player1, player2))
+
+    start: float = time.perf_counter()
+    results = asyncio.run(
+        Coordinator(pairs, num_games, chunk_size, heartbeat_timeout)
+        .serve(host, port, lambda p: print(f"Listening on {host}:{p}")))
+    elapsed: float = time.perf_counter() - start
+    for (player1, player2), pair_results in zip(pairs, results):
+        print()
+        print(f"{player1} vs. {player2}:")
+        print_results([pair_results[seed] for seed in sorted(pair_results)])
+    print()
+    print(f"{len(pairs) * num_games} games in {elapsed:.1f}s")
+
+
+@main.command("worker")
+@click.option('--host', default="127.0.0.1")
+@click.option('--port', type=int, default=5555)
+@click.option('--heartbeat-interval', type=float, default=1.0)
+def worker(host: str, port: int, heartbeat_interval: float) -> None:
+    games_played: int = run_worker(host, port, heartbeat_interval)
+    print(f"Played {games_played} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,38 @@
+from __future__ import annotations
+
 import os
 import sys
 import math
+import threading
+import time
 import click
-from typing import List, Tuple, Optional, Union
+from typing import Dict, Iterator, List, Tuple, Optional, Union, Set, \
+    TYPE_CHECKING
 from reversi import Reversi, Board, BoardGridType, COLORS
 from bot import ReversiBot
-from termcolor import colored, cprint
+from profiling import profile, profile_option
+
+if TYPE_CHECKING:
+    import pygame
+
+BOT_MOVE : int = 0
+"""
+Event posted by the bot worker thread when it has chosen a move
+(set by load_pygame)
+"""
+
 
-os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-import pygame  # pylint: disable=wrong-import-position
+def load_pygame() -> None:
+    """
+    Imports pygame, the first time a window is opened (so that
+    importing this module stays cheap)
+
+    Returns: nothing
+    """
+    global pygame, BOT_MOVE  # pylint: disable=global-statement
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+    import pygame  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    BOT_MOVE = pygame.USEREVENT + 1
 
 
 @click.command("gui")
@@ -19,9 +43,12 @@ import pygame  # pylint: disable=wrong-import-position
 @click.option("--bot",
               type = click.Choice(["random", "smart", "very-smart"]),
               default = None)
+@profile_option
 def run_game(num_players: int, board_size: int, othello: bool, 
-             non_othello: bool, bot: Optional[str]):
-    Game_Interface(Reversi(board_size, num_players, not non_othello))
+             non_othello: bool, bot: Optional[str],
+             profile_path: Optional[str]):
+    with profile(profile_path):
+        Game_Interface(Reversi(board_size, num_players, not non_othello), bot)
 
 class Game_Interface:
     """
@@ -32,39 +59,150 @@ class Game_Interface:
     border : int
     grid : List[List[bool]]
     surface : pygame.surface.Surface
-    clock : pygame.time.Clock
-
-    def __init__(self, game: Reversi):
+    legal_moves : Set[Tuple[int, int]]
+    grid_snapshot : BoardGridType
+    dirty_cells : Set[Tuple[int, int]]
+    full_redraw : bool
+    fonts : Dict[Tuple[str, int], pygame.font.Font]
+    texts : Dict[Tuple[str, int, Tuple[int, int, int]], pygame.surface.Surface]
+    sprites : Dict[Tuple[int, int], pygame.surface.Surface]
+    bot : Optional[str]
+    moves_played : int
+    thinking : bool
+    think_start : float
+    progress_shown : bool
+    view_x : int
+    view_y : int
+    scroll_by : List[int]
+    viewport_dirty : bool
+    dragging : bool
+
+    background_color : Tuple[int, int, int] = (35, 35, 35)
+    board_color : Tuple[int, int, int] = (75, 75, 75)
+    frame_ms : int = 1000 // 24
+    start_square : int = 24
+    max_square : int = 120
+    zoom_step : float = 1.25
+
+    def __init__(self, game: Reversi, bot: Optional[str] = None):
         """
         Constructor
 
         Parameters:
+            game : Reversi : the game to play
+            bot : str : if given, every player but Player 1 is a bot
+                        using this strategy
             window : int : height of window
             border : int : number of pixels to use as border around elements
             cells_side : int : number of cells on a side of a square bitmap grid
+            viewport : int : size in pixels of the visible part of the board
+            square : int : size in pixels of a cell (changes when zooming)
+            panel : int : size in pixels of the turn indicator
         """
+        load_pygame()
         self.game = game
         self.window : int = 600
         self.border : int = 10
         self.cells_side : int = self.game.size
-        self.square : int = (self.window - 2 * self.border) // self.cells_side
+        self.viewport : int = self.window - 2 * self.border
+        # Smallest zoom shows the whole board; large boards start zoomed in
+        self.min_square : int = max(2, self.viewport // self.cells_side)
+        # Small boards are shown with cells larger than the class maximum
+        self.max_square : int = max(self.max_square, self.min_square)
+        self.square : int = max(self.min_square, self.start_square)
+        self.panel : int = max(self.min_square, 40)
+        self.view_x = 0
+        self.view_y = 0
+        self.scroll_by = [0, 0]
+        self.viewport_dirty = False
+        self.dragging = False
         self.players = game.num_players
         self.color_list: List[Tuple[int, int, int]] = [(155, 155, 155),
                             (105, 105, 105), (8, 39, 245), (8, 255, 8),
                             (255, 173, 0), (251, 72, 196), (235, 33, 46),
                             (199, 36, 177), (254, 219, 0)]
+        self.fonts = {}
+        self.texts = {}
+        self.sprites = {}
+        self.legal_moves = set()
+        self.grid_snapshot = [[None] * self.cells_side
+                              for _ in range(self.cells_side)]
+        self.dirty_cells = set()
+        self.update_state()
+        self.full_redraw = True
+        self.bot = bot
+        self.moves_played = 0
+        self.thinking = False
+        self.think_start = 0.0
+        self.progress_shown = False
         # Initialize Pygame
         pygame.init()
         # Set window title
         pygame.display.set_caption("BitEdit")
         # Set window size
         self.surface = pygame.display.set_mode(\
-                (self.window + self.border + self.square * 1.5, self.window))
-        self.clock = pygame.time.Clock()
+                (self.window + self.border + self.panel * 1.5, self.window))
 
+        self.start_bot()
         self.event_loop()
 
+    def update_state(self) -> None:
+        """
+        Caches the legal moves and the grid of the game, so that drawing
+        a frame does not need to query the game, and marks the cells
+        whose appearance changed as dirty. Must be called whenever
+        a move is applied.
+
+        Parameters: none beyond self
+
+        Returns: nothing
+        """
+        old_legal : Set[Tuple[int, int]] = self.legal_moves
+        old_grid : BoardGridType = self.grid_snapshot
+        self.legal_moves = set(self.game.available_moves)
+        self.grid_snapshot = self.game.grid
+        # Legal moves are highlighted in the color of the player to move,
+        # so the old and new highlights both need redrawing
+        self.dirty_cells |= old_legal | self.legal_moves
+        for row, (old_row, new_row) in enumerate(zip(old_grid,
+                                                     self.grid_snapshot)):
+            for col, (old, new) in enumerate(zip(old_row, new_row)):
+                if old != new:
+                    self.dirty_cells.add((row, col))
+        if self.game.done:
+            self.full_redraw = True
+
+    def font(self, size: int) -> pygame.font.Font:
+        """
+        Returns the Impact font in the given size, loading it only once.
+        """
+        if ("Impact", size) not in self.fonts:
+            self.fonts[("Impact", size)] = pygame.font.SysFont('Impact', size)
+        return self.fonts[("Impact", size)]
+
+    def text(self, text: str, size: int,
+             color: Tuple[int, int, int]) -> pygame.surface.Surface:
+        """
+        Returns a rendered text surface, rendering it only once.
+        """
+        key = (text, size, color)
+        if key not in self.texts:
+            self.texts[key] = self.font(size).render(text, False, color)
+        return self.texts[key]
 
+    def sprite(self, player: int, size: int) -> pygame.surface.Surface:
+        """
+        Returns the piece of a player, pre-rendered on a transparent
+        square of the given size.
+        """
+        key = (player, size)
+        if key not in self.sprites:
+            sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, self.color_list[player - 1],
+                               (size / 2, size / 2),
+                               max(1, size // 2 - max(1, size // 14)))
+            self.sprites[key] = sprite
+        return self.sprites[key]
 
     def piece_placer(self, loc) -> None:
         """
@@ -75,129 +213,463 @@ class Game_Interface:
         Returns: nothing
         """
         x, y = loc
-        self_x : Optional[int] = None
-        self_y : Optional[int] = None
-        grid_edge : int = self.border + self.square * self.cells_side
-        if self.border < x < grid_edge:
-            self_x = (x - self.border) // (self.square)
-        if self.border < x < grid_edge:
-            self_y = (y - self.border) // (self.square)
-        if self_x is not None and self_y is not None and \
-            self.game.legal_move((self_y, self_x)):
-            self.game.grid[self_y][self_x] = self.game.turn
-            self.game.apply_move((self_y, self_x))
+        if not self.viewport_rect().collidepoint(x, y):
+            return
+        self_x : int = (x - self.border + self.view_x) // self.square
+        self_y : int = (y - self.border + self.view_y) // self.square
+        if (self_y, self_x) in self.legal_moves:
+            self.play_move((self_y, self_x))
+
+    def viewport_rect(self) -> pygame.Rect:
+        """
+        Returns: the area of the window showing the board
+        """
+        return pygame.Rect(self.border, self.border,
+                           self.viewport, self.viewport)
+
+    def clamp_view(self) -> None:
+        """
+        Keeps the viewport within the board
+        """
+        limit : int = max(0, self.square * self.cells_side - self.viewport)
+        self.view_x = min(max(self.view_x, 0), limit)
+        self.view_y = min(max(self.view_y, 0), limit)
+
+    def cells_in(self, rect: pygame.Rect) -> Iterator[Tuple[int, int]]:
+        """
+        Returns: the cells intersecting an area of the window
+        """
+        first_col : int = max(0, (rect.left - self.border + self.view_x)
+                              // self.square)
+        last_col : int = min(self.cells_side - 1,
+                             (rect.right - 1 - self.border + self.view_x)
+                             // self.square)
+        first_row : int = max(0, (rect.top - self.border + self.view_y)
+                              // self.square)
+        last_row : int = min(self.cells_side - 1,
+                             (rect.bottom - 1 - self.border + self.view_y)
+                             // self.square)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                yield row, col
+
+    def pan(self, dx: int, dy: int) -> None:
+        """
+        Moves the viewport (the move is drawn with the next frame)
+
+        Parameters: the number of pixels to move right and down
+
+        Returns: nothing
+        """
+        self.scroll_by[0] += dx
+        self.scroll_by[1] += dy
+
+    def zoom(self, factor: float, center: Tuple[int, int]) -> None:
+        """
+        Changes the size of the cells, keeping the point of the board
+        under center in place
+
+        Parameters: the zoom factor (0 to show the whole board) and a
+        point of the window
+
+        Returns: nothing
+        """
+        if factor == 0:
+            square : int = self.min_square
+        else:
+            square = round(self.square * factor)
+            if square == self.square:
+                square += 1 if factor > 1 else -1
+            square = min(max(square, self.min_square), self.max_square)
+        x : int = center[0] - self.border
+        y : int = center[1] - self.border
+        self.view_x = round((x + self.view_x) * square / self.square) - x
+        self.view_y = round((y + self.view_y) * square / self.square) - y
+        self.square = square
+        self.clamp_view()
+        self.viewport_dirty = True
+
+    def play_move(self, pos: Tuple[int, int]) -> None:
+        """
+        Applies a move, and lets the bot think if it plays next
+
+        Parameters: the position of the move
+
+        Returns: nothing
+        """
+        self.game.apply_move(pos)
+        self.moves_played += 1
+        self.update_state()
+        self.start_bot()
+
+    def bot_turn(self) -> bool:
+        """
+        Returns: whether the player to move is a bot
+        """
+        return self.bot is not None and not self.game.done and \
+            self.game.turn != 1
+
+    def start_bot(self) -> None:
+        """
+        If the player to move is a bot, starts choosing its move in a
+        worker thread. The worker gets its own copy of the game, and
+        posts the move back as a BOT_MOVE event, so the event loop
+        keeps running while it thinks.
+
+        Parameters: none beyond self
+
+        Returns: nothing
+        """
+        if self.bot is None or not self.bot_turn() or self.thinking:
+            return
+        self.thinking = True
+        self.think_start = time.monotonic()
+        snapshot : Reversi = self.game.simulate_moves([])
+        threading.Thread(target=self.bot_worker,
+                         args=(snapshot, self.bot, self.moves_played),
+                         daemon=True).start()
+
+    @staticmethod
+    def bot_worker(snapshot: Reversi, bot: str, version: int) -> None:
+        """
+        Chooses a bot move (runs in a worker thread). The BOT_MOVE event
+        is posted even if the bot fails (with move None and the error),
+        so that the event loop always stops waiting for it.
+
+        Parameters: a copy of the game, the bot strategy, and the number
+        of moves played when the copy was made
+
+        Returns: nothing
+        """
+        move : Optional[Tuple[int, int]] = None
+        error : Optional[str] = None
+        try:
+            move = ReversiBot(snapshot).hint(bot)
+        except Exception as e:  # pylint: disable=broad-except
+            error = f"{type(e).__name__}: {e}"
+        pygame.event.post(pygame.event.Event(BOT_MOVE, move=move,
+                                             error=error, version=version))
+
+    def bot_failed(self, error: str) -> None:
+        """
+        Reports that the bot could not choose a move, and lets the
+        human play the bot's remaining moves
+
+        Parameters: the error raised by the bot
+
+        Returns: nothing
+        """
+        print(f"The {self.bot} bot failed to choose a move ({error}). " +
+              "The remaining moves are played by hand.", file=sys.stderr)
+        pygame.display.set_caption("BitEdit (bot failed)")
+        self.bot = None
         
     def game_over(self) -> None:
+        """
+        Draws the game over screen
+
+        Parameters: none beyond self
+
+        Returns: nothing
+        """
         list_str : map[str] = map(str, self.game.outcome)
         winners : str = ' '.join(list_str)
+        text_color : Tuple[int, int, int] = (35, 35, 35)
         if len(self.game.outcome) > 1:
             self.surface.fill((255, 87, 51))
-            my_font = pygame.font.SysFont('Impact', 155)
-            text_surface = my_font.render('GAME OVER', False, (35, 35, 35))
-            self.surface.blit(text_surface, (0, 0))
+            self.surface.blit(self.text('GAME OVER', 155, text_color), (0, 0))
             tie_txt : str = "TIE BETWEEN {}"
             tie_txt = tie_txt.format(winners)
-            text_surface = my_font.render(tie_txt, False, (35, 35, 35))
-            self.surface.blit(text_surface, (0, 300))
+            self.surface.blit(self.text(tie_txt, 155, text_color), (0, 300))
+        else:
+            win_color : Tuple[int, int, int] = \
+                (self.color_list[self.game.outcome[0] - 1])
+            self.surface.fill(win_color)
+            self.surface.blit(self.text('GAME OVER', 155, text_color), (0, 0))
+            winner : str = "PLAYER {} WINS"
+            winner = winner.format(winners)
+            self.surface.blit(self.text(winner, 117, text_color), (0, 300))
+
+    def draw_turn(self) -> pygame.Rect:
+        """
+        Draws the indicator showing whose turn it is
+
+        Parameters: none beyond self
+
+        Returns: the area that was drawn
+        """
+        left : int = self.border + self.viewport + self.panel // 2
+        text_loc : Tuple[float, float] = (left,
+                                          self.border + 1.5 * self.panel)
+        turn_rect = pygame.Rect(left, self.border + 2 * self.panel,
+                                self.panel, self.panel)
+        font_size : int = int(self.panel // 2.2)
+
+        text_surface = self.text('TURN', font_size, self.board_color)
+        text_rect = self.surface.blit(text_surface, text_loc)
+        pygame.draw.rect(self.surface, self.board_color, rect = turn_rect)
+        self.surface.blit(self.sprite(self.game.turn, self.panel), turn_rect)
+        return text_rect.union(turn_rect)
+
+    def draw_progress(self) -> pygame.Rect:
+        """
+        Draws (or clears) the indicator showing that the bot is thinking
+
+        Parameters: none beyond self
+
+        Returns: the area that was drawn
+        """
+        rect = pygame.Rect(self.border + self.viewport + self.panel // 2,
+                           int(self.border + 3.25 * self.panel), self.panel,
+                           self.panel)
+        pygame.draw.rect(self.surface, self.background_color, rect=rect)
+        if self.thinking:
+            font_size : int = int(self.panel // 2.2)
+            self.surface.blit(self.text('BOT', font_size, self.board_color),
+                              rect.topleft)
+            # One to three dots, cycling every second
+            dots : int = int((time.monotonic() - self.think_start) * 3) % 3 + 1
+            radius : int = max(2, self.panel // 12)
+            for k in range(dots):
+                pygame.draw.circle(self.surface, self.board_color,
+                                   (rect.left + radius + 3 * radius * k,
+                                    rect.top + self.panel * 3 // 4), radius)
+        self.progress_shown = self.thinking
+        return rect
+
+    def draw_cell(self, row: int, col: int) -> pygame.Rect:
+        """
+        Draws one cell of the board, and the piece on it (the caller
+        clips drawing to the viewport)
 
+        Parameters: the row and column of the cell
 
-        win_color : Tuple[int, int, int] = (self.color_list[self.game.outcome[0] - 1])
-        self.surface.fill(win_color)
-        my_font = pygame.font.SysFont('Impact', 155)
-        text_surface = my_font.render('GAME OVER', False, (35, 35, 35))
-        self.surface.blit(text_surface, (0, 0))
-        my_font = pygame.font.SysFont('Impact', 117)
-        winner : str = "PLAYER {} WINS"
-        winner = winner.format(winners)
-        text_surface = my_font.render(winner, False, (35, 35, 35))
-        self.surface.blit(text_surface, (0, 300))
+        Returns: the area that was drawn
+        """
+        rect = pygame.Rect(self.border + col * self.square - self.view_x,
+                           self.border + row * self.square - self.view_y,
+                           self.square, self.square)
+        # A one pixel outline in the background color. The rects are
+        # clipped here because pygame does not fill partly off-screen
+        # rects exactly
+        clip : pygame.Rect = self.surface.get_clip()
+        self.surface.fill(self.background_color, rect.clip(clip))
+        if (row, col) in self.legal_moves:
+            self.surface.fill(self.color_list[self.game.turn - 1],
+                              rect.inflate(-2, -2).clip(clip))
+        else:
+            self.surface.fill(self.board_color,
+                              rect.inflate(-2, -2).clip(clip))
+        b: Optional[int] = self.grid_snapshot[row][col]
+        if b is not None:
+            self.surface.blit(self.sprite(b, self.square), rect)
+        return rect
+
+    def draw_area(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Draws the cells of the board intersecting an area of the viewport
 
+        Parameters: the area, in window coordinates
+
+        Returns: the area that was drawn
+        """
+        self.surface.set_clip(rect)
+        self.surface.fill(self.background_color, rect)
+        for row, col in self.cells_in(rect):
+            self.draw_cell(row, col)
+        self.surface.set_clip(None)
+        return rect
+
+    def draw_scroll(self) -> Optional[pygame.Rect]:
+        """
+        Applies the pending pan by shifting what is already drawn in the
+        viewport, and drawing only the strips of cells that came into view
 
+        Parameters: none beyond self
 
+        Returns: the area that changed, if any
+        """
+        old_x, old_y = self.view_x, self.view_y
+        self.view_x += self.scroll_by[0]
+        self.view_y += self.scroll_by[1]
+        self.scroll_by = [0, 0]
+        self.clamp_view()
+        dx : int = self.view_x - old_x
+        dy : int = self.view_y - old_y
+        if dx == 0 and dy == 0:
+            return None
+        view : pygame.Rect = self.viewport_rect()
+        if abs(dx) >= self.viewport or abs(dy) >= self.viewport:
+            return self.draw_area(view)
+        self.surface.set_clip(view)
+        self.surface.scroll(-dx, -dy)
+        self.surface.set_clip(None)
+        if dx > 0:
+            self.draw_area(pygame.Rect(view.right - dx, view.top,
+                                       dx, view.height))
+        elif dx < 0:
+            self.draw_area(pygame.Rect(view.left, view.top,
+                                       -dx, view.height))
+        if dy > 0:
+            self.draw_area(pygame.Rect(view.left, view.bottom - dy,
+                                       view.width, dy))
+        elif dy < 0:
+            self.draw_area(pygame.Rect(view.left, view.top,
+                                       view.width, -dy))
+        return view
 
     def draw_window(self) -> None:
         """
-        Draws the contents of the window
+        Draws the parts of the window that changed since the last
+        frame, and updates only those parts of the display. Only the
+        cells inside the viewport are ever drawn.
 
         Parameters: none beyond self
 
         Returns: nothing
         """
-        turn_color: Tuple[int, int, int] = self.color_list[self.game.turn - 1]
-        background_color: Tuple[int, int, int] = (35, 35, 35)
-        board_color: Tuple[int, int, int] = (75, 75, 75)
-        circle_radius: int = self.square // 2 - 5
-
-        #Create the Background and Turn
-        turn_center : Tuple[int, float]= (self.border + self.square * (self.cells_side + 1), 
-                        self.border + 2.5 * self.square)
-        turn_rect  = (int(self.border + self.square * (self.cells_side + 0.5)), 
-                    self.border + 2 * self.square , self.square, self.square)
-        text_loc : Tuple[float, float] = (self.border + self.square * (self.cells_side + 0.5), 
-                    self.border + 1.5 * self.square)
-        font_size : int = int(self.square // 2.2)
-
-        self.surface.fill(background_color)
-        my_font = pygame.font.SysFont('Impact', font_size)
-        text_surface = my_font.render('TURN', False, board_color)
-        self.surface.blit(text_surface, text_loc)
-        pygame.draw.rect(self.surface, board_color, rect = turn_rect)
-        pygame.draw.circle(self.surface, turn_color, turn_center, circle_radius)
+        if self.full_redraw:
+            self.surface.fill(self.background_color)
+            if self.game.done:
+                self.game_over()
+            else:
+                self.draw_turn()
+                self.draw_progress()
+                self.clamp_view()
+                self.draw_area(self.viewport_rect())
+            pygame.display.update()
+            self.full_redraw = False
+            self.viewport_dirty = False
+            self.scroll_by = [0, 0]
+            self.dirty_cells.clear()
+            return
+
+        rects : List[pygame.Rect] = []
+        if self.viewport_dirty:
+            self.view_x += self.scroll_by[0]
+            self.view_y += self.scroll_by[1]
+            self.scroll_by = [0, 0]
+            self.clamp_view()
+            rects.append(self.draw_area(self.viewport_rect()))
+            self.viewport_dirty = False
+        elif self.scroll_by != [0, 0]:
+            scrolled : Optional[pygame.Rect] = self.draw_scroll()
+            if scrolled is not None:
+                rects.append(scrolled)
+        if self.thinking or self.progress_shown:
+            rects.append(self.draw_progress())
+        if self.dirty_cells:
+            view : pygame.Rect = self.viewport_rect()
+            self.surface.set_clip(view)
+            for row, col in self.dirty_cells:
+                rect : pygame.Rect = self.draw_cell(row, col).clip(view)
+                if rect.width > 0 and rect.height > 0:
+                    rects.append(rect)
+            self.surface.set_clip(None)
+            rects.append(self.draw_turn())
+        if rects:
+            pygame.display.update(rects)
+        self.dirty_cells.clear()
+
+    def waiting(self) -> bool:
+        """
+        Whether something other than the user can change the window
+        (so the event loop must wake up periodically)
 
-        
-        #Places Pieces
-        for row in range(self.cells_side):
-            for col in range(self.cells_side):
-                rect : Tuple[int, int, int, int]= (self.border + col * self.square,
-                        self.border + row * self.square,
-                        self.square, self.square)
-                circle_center : Tuple[float, float] = (self.border + (col + 0.5) * self.square, 
-                                    self.border + (row + 0.5) * self.square)
-                pygame.draw.rect(self.surface, board_color,
-                                 rect=rect)
-                if self.game.legal_move((row, col)):
-                    pygame.draw.rect(self.surface, turn_color, rect=rect)
-                pygame.draw.rect(self.surface, background_color,
-                                     rect=rect, width=1)
-                b: Optional[int] = self.game.grid[row][col]
-                if b is None:
-                    pass
+        Parameters: none beyond self
+
+        Returns: True if the window must be redrawn without user input
+        """
+        return self.thinking
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """
+        Handles one event
+
+        Parameters: the event
+
+        Returns: nothing
+        """
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+        if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            self.full_redraw = True
+        elif event.type == BOT_MOVE:
+            # Ignore moves chosen for a position that is no longer current
+            if event.version == self.moves_played:
+                self.thinking = False
+                if event.move is None:
+                    self.bot_failed(event.error)
                 else:
-                    color : Tuple[int, int, int] = self.color_list[b - 1]
-                    pygame.draw.circle(self.surface, color, circle_center, circle_radius)
+                    self.play_move(event.move)
+        elif self.game.done:
+            return
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 \
+                and not self.bot_turn():
+            self.piece_placer(event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (2, 3):
+            # Drag with the right or middle button to pan
+            self.dragging = True
+            pygame.event.set_allowed(pygame.MOUSEMOTION)
+        elif event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+            self.dragging = False
+            pygame.event.set_blocked(pygame.MOUSEMOTION)
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.MOUSEWHEEL:
+            self.zoom(self.zoom_step ** event.y, pygame.mouse.get_pos())
+        elif event.type == pygame.KEYDOWN:
+            self.handle_key(event.key)
+
+    def handle_key(self, key: int) -> None:
+        """
+        Handles zoom (+, -, 0) and pan (arrow keys) keys
 
-        if self.game.done:
-            self.game_over()
+        Parameters: the key that was pressed
+
+        Returns: nothing
+        """
+        center : Tuple[int, int] = self.viewport_rect().center
+        step : int = self.viewport // 4
+        if key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.zoom(self.zoom_step, center)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.zoom(1 / self.zoom_step, center)
+        elif key in (pygame.K_0, pygame.K_KP0):
+            self.zoom(0, center)
+        elif key == pygame.K_LEFT:
+            self.pan(-step, 0)
+        elif key == pygame.K_RIGHT:
+            self.pan(step, 0)
+        elif key == pygame.K_UP:
+            self.pan(0, -step)
+        elif key == pygame.K_DOWN:
+            self.pan(0, step)
 
     def event_loop(self) -> None:
         """
-        Handles user interactions
+        Handles user interactions. Sleeps until an event arrives (or,
+        while waiting for something other than the user, until the next
+        frame is due), and redraws only after something changed.
 
         Parameters: none beyond self
 
         Returns: nothing
         """
+        # Mouse movement never changes the window, so don't wake up for it
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
         while True:
-            # Process Pygame events
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if self.game.done:
-                    self.game_over()
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    pos2 = pygame.mouse.get_pos()
-                    loc2 = [pos2[0], pos2[1]]
-                    self.piece_placer(loc2)
-
-
-                # Handle any other event types here
+            if self.waiting():
+                event = pygame.event.wait(self.frame_ms)
+            else:
+                event = pygame.event.wait()
+            self.handle_event(event)
+            for event in pygame.event.get():
+                self.handle_event(event)
 
             # Update the display
             self.draw_window()
-            pygame.display.update()
-            self.clock.tick(24)
 
 
 if __name__ == "__main__":
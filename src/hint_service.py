@@ -0,0 +1,311 @@
+"""
+Batched hint service
+(and command for running it)
+
+Answers bot hint requests for many games at once, over TCP, with one
+JSON request and one JSON response per line (as in the game server).
+
+Commands:
+    {"cmd": "hint", "grid": GRID, "turn": TURN, "players": PLAYERS,
+     "strategy": "random"|"smart"|"very-smart"}
+    {"cmd": "stats"}
+
+GRID is a list of lists, as returned by Reversi.grid, and the
+strategy defaults to "very-smart" (the one used for hints in the
+TUI). The response to a hint has the suggested move in "pos" (an
+empty list if the player to move has to pass), and "cached": true if
+it came from the cache. Requests may have an "id"
+field, which is copied into the response, and several requests can
+be sent on one connection without waiting for the responses (which
+then come back in the order they are ready).
+
+Requests are keyed by position hash and strategy. Requests for a
+position that is already being computed wait for that computation
+instead of starting another one, new positions are queued and sent
+to worker processes in batches, and results are kept in an LRU cache.
+With --canonical, positions are first mapped to their canonical form
+(see symmetry.py), so the 8 rotations and reflections of a position
+share one cache entry and one computation.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import click
+
+from reversi import position_hash
+from server import STRATEGIES, RequestError, Response, load_position
+from bot import ReversiBot
+from symmetry import canonicalize, from_canonical
+
+HintKey = Tuple[int, str]
+HintJob = Tuple[int, int, int, bytes, str]
+
+
+def compute_hints(jobs: List[HintJob]) -> List[Union[List[int], str]]:
+    """
+    Computes a batch of hints (runs in a worker process).
+
+    Args:
+        jobs: (side, players, turn, board, strategy) for each hint
+    Returns: for each job, the suggested move (empty if the player to
+    move has to pass), or an error message. A job that fails only
+    gets an error for itself, not for the rest of the batch.
+    """
+    hints: List[Union[List[int], str]] = []
+    for side, players, turn, board, strategy in jobs:
+        try:
+            game = load_position(side, players, False, turn, board)
+            if game.done:
+                hints.append("the game is over")
+            elif not game.available_moves:
+                hints.append([])
+            else:
+                hints.append(list(ReversiBot(game).hint(strategy)))
+        except ValueError as e:
+            hints.append(str(e))
+        except Exception as e:  # pylint: disable=broad-except
+            hints.append(f"hint failed: {e}")
+    return hints
+
+
+class HintService:
+    """
+    Service computing bot hints, with request coalescing and caching.
+    """
+
+    cache_size: int
+    batch_size: int
+    canonical: bool
+    port: int
+    hits: int
+    misses: int
+    coalesced: int
+
+    _cache: "OrderedDict[HintKey, List[int]]"
+    _inflight: Dict[HintKey, "asyncio.Future[Union[List[int], str]]"]
+    _queue: "asyncio.Queue[Tuple[HintKey, HintJob]]"
+    _workers: int
+    _pool: ProcessPoolExecutor
+
+    def __init__(self, workers: int = 2, batch_size: int = 32,
+                 cache_size: int = 100_000, canonical: bool = False):
+        """
+        Constructor
+
+        Args:
+            workers: number of processes computing hints
+            batch_size: maximum number of positions sent to a
+            worker process at once
+            cache_size: maximum number of hints kept in the cache
+            canonical: whether to key hints by the canonical form of
+            positions, so that symmetric positions share them
+        """
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.canonical = canonical
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.port = 0
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._queue = asyncio.Queue()
+        self._workers = workers
+        self._pool = ProcessPoolExecutor(workers)
+
+    @property
+    def stats(self) -> Response:
+        """
+        Returns: the queue depth and cache statistics
+        """
+        requests: int = self.hits + self.misses + self.coalesced
+        return {"queue_depth": self._queue.qsize(),
+                "in_flight": len(self._inflight),
+                "cache_size": len(self._cache),
+                "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / requests if requests else 0.0}
+
+    async def hint(self, side: int, players: int, turn: int, board: bytes,
+                   strategy: str) -> Tuple[List[int], bool]:
+        """
+        Returns a hint for a position.
+
+        Raises:
+            RequestError: if the position is invalid
+        Returns: the suggested move, and whether it came from the cache
+        """
+        transform: int = 0
+        if self.canonical and len(board) == side * side:
+            board, transform = canonicalize(board, side)
+        key: HintKey = (position_hash(side, players, turn, board), strategy)
+        cached: Optional[List[int]] = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._restore(cached, side, transform), True
+
+        future = self._inflight.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._queue.put_nowait((key, (side, players, turn, board,
+                                          strategy)))
+        else:
+            self.coalesced += 1
+        result: Union[List[int], str] = await asyncio.shield(future)
+        if isinstance(result, str):
+            raise RequestError(result)
+        return self._restore(result, side, transform), False
+
+    @staticmethod
+    def _restore(move: List[int], side: int, transform: int) -> List[int]:
+        """
+        Returns: a move computed on the canonical form of a position,
+        mapped back to the position
+        """
+        if transform == 0 or not move:
+            return move
+        return list(from_canonical((move[0], move[1]), side, transform))
+
+    async def _dispatch(self) -> None:
+        """
+        Sends queued positions to the worker processes in batches.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[HintKey, HintJob]] = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, compute_hints, [job for _, job in batch])
+            except Exception as e:  # pylint: disable=broad-except
+                results = [f"hint failed: {e}"] * len(batch)
+            for (key, _), result in zip(batch, results):
+                if not isinstance(result, str):
+                    self._cache[key] = result
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                self._inflight.pop(key).set_result(result)
+
+    async def handle_request(self, request: Dict[str, Any]) -> Response:
+        """
+        Handles one request.
+
+        Args:
+            request: the decoded request
+        Returns: the response (without the "id" field)
+        """
+        try:
+            if request.get("cmd") == "stats":
+                return {"ok": True, **self.stats}
+            if request.get("cmd") != "hint":
+                raise RequestError("unknown command")
+            strategy: str = request.get("strategy", "very-smart")
+            if strategy not in STRATEGIES:
+                raise RequestError("unknown strategy")
+            grid: List[List[Optional[int]]] = request["grid"]
+            board: bytes = bytes([square or 0 for row in grid
+                                  for square in row])
+            pos, cached = await self.hint(len(grid), int(request["players"]),
+                                          int(request["turn"]), board,
+                                          strategy)
+            return {"ok": True, "pos": pos, "cached": cached}
+        except (RequestError, ValueError, TypeError, KeyError) as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one client connection. Requests are handled
+        concurrently, and each response is sent when it is ready.
+        """
+        async def respond(request: Dict[str, Any]) -> None:
+            response: Response = await self.handle_request(request)
+            if "id" in request:
+                response["id"] = request["id"]
+            writer.write(json.dumps(response).encode() + b"\n")
+
+        tasks = set()
+        try:
+            async for line in reader:
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("requests must be JSON objects")
+                except ValueError as e:
+                    writer.write(json.dumps({"ok": False, "error": str(e)})
+                                 .encode() + b"\n")
+                    continue
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.wait(tasks)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 7778,
+                    ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Accepts connections until cancelled.
+
+        Args:
+            host: address to listen on
+            port: port to listen on (0 picks a free port)
+            ready: set once the service is listening
+        """
+        dispatchers = [asyncio.create_task(self._dispatch())
+                       for _ in range(self._workers)]
+        server = await asyncio.start_server(self._handle_connection,
+                                            host, port, limit=2 ** 20)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for dispatcher in dispatchers:
+                dispatcher.cancel()
+            self._pool.shutdown(cancel_futures=True)
+
+
+@click.command("hint-service")
+@click.option('--host', default="127.0.0.1")
+@click.option('--port', type=int, default=7778)
+@click.option('-w', '--workers', type=int, default=2,
+              help="Number of processes computing hints")
+@click.option('--batch-size', type=int, default=32)
+@click.option('--cache-size', type=int, default=100_000)
+@click.option('--canonical', is_flag=True,
+              help="Share hints between symmetric positions")
+def main(host: str, port: int, workers: int, batch_size: int,
+         cache_size: int, canonical: bool) -> None:
+    async def run() -> None:
+        service: HintService = HintService(workers, batch_size, cache_size,
+                                           canonical)
+        ready: asyncio.Event = asyncio.Event()
+        serving = asyncio.create_task(service.serve(host, port, ready))
+        await ready.wait()
+        print(f"Listening on {host}:{service.port}", flush=True)
+        await serving
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
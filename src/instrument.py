@@ -0,0 +1,249 @@
+"""
+Opt-in instrumentation of the game engine and the bots
+
+    with instrument() as stats:
+        play_game("smart", "very-smart", Reversi(8, 2, True))
+    stats.print_report()
+
+While the context manager is active, the public methods of Reversi,
+Board.in_board and the bots' suggest_move are replaced by wrappers
+that count calls, time them and update the counters below. The
+original methods are put back on exit, so the engine runs unchanged
+(and at full speed) when instrumentation is off.
+
+Counters:
+    moves_generated: moves returned by available_moves
+    squares_scanned: squares visited by legal_move and captures
+                     (calls to Board.in_board made while one of them
+                     runs, not those of piece_at, apply_move, ...)
+    flips: pieces flipped by apply_move
+    copies: copies of a game (by simulate_moves and load_game)
+    bot_nodes: candidate moves evaluated by the bots
+               (calls to captures made by a bot while it chooses a
+               move, not those made by the moves it simulates)
+
+Timers are inclusive: the time of a method includes the time of the
+methods it calls.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, \
+    Type, Union
+
+from reversi import Reversi, Board
+from bot import RandomBot, SmartBot, VerySmartBot
+
+COUNTERS: List[str] = ["moves_generated", "squares_scanned", "flips",
+                       "copies", "bot_nodes"]
+
+PROPERTIES: List[str] = ["grid", "turn", "available_moves", "prelim",
+                         "done", "outcome"]
+"""
+Properties of Reversi that are timed
+"""
+
+METHODS: List[str] = ["piece_at", "legal_move", "captures", "apply_move",
+                      "load_game", "simulate_moves", "encode",
+                      "position_hash", "load_encoded"]
+"""
+Methods of Reversi that are timed
+"""
+
+BOTS: List[Type[Union[RandomBot, SmartBot, VerySmartBot]]] = [
+    RandomBot, SmartBot, VerySmartBot]
+
+
+class EngineStats:
+    """
+    Counters and timers collected while instrumentation is active
+    """
+
+    counters: Dict[str, int]
+    timers: Dict[str, List[float]]
+
+    _apply_depth: int
+    _bot_depth: int
+    _scan_depth: int
+
+    def __init__(self) -> None:
+        """
+        Constructor
+
+        Attributes:
+            counters: value of each counter (see the module docstring)
+            timers: [number of calls, total seconds] of each method,
+            by qualified name (e.g. "Reversi.legal_move")
+        """
+        self.counters = {name: 0 for name in COUNTERS}
+        self.timers = {}
+        self._apply_depth = 0
+        self._bot_depth = 0
+        self._scan_depth = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Returns: the counters and timers, ready to be written as JSON
+        """
+        return {"counters": dict(self.counters),
+                "timers": {name: {"calls": int(calls), "seconds": seconds}
+                           for name, (calls, seconds) in self.timers.items()}}
+
+    def print_report(self) -> None:
+        """
+        Prints the counters, and the timers of the methods that were
+        called, sorted by total time
+        """
+        for name in COUNTERS:
+            print(f"{name:<24}{self.counters[name]:>12}")
+        print()
+        print("Method                         calls     total (ms)   " +
+              "per call (us)")
+        for name, (calls, seconds) in sorted(self.timers.items(),
+                                             key=lambda item: -item[1][1]):
+            if not calls:
+                continue
+            print(f"{name:<28}{int(calls):>8}{seconds * 1000:>15.3f}" +
+                  f"{seconds / calls * 1e6:>16.3f}")
+
+    def _timed(self, name: str, func: Callable[..., Any],
+               before: Optional[Callable[..., None]] = None,
+               after: Optional[Callable[[Any], None]] = None) \
+            -> Callable[..., Any]:
+        """
+        Returns: a wrapper around func that times it under the given
+        name, and calls before (with the arguments) and after (with
+        the result)
+        """
+        timer: List[float] = self.timers.setdefault(name, [0, 0.0])
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if before is not None:
+                before(*args, **kwargs)
+            start: float = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += time.perf_counter() - start
+            if after is not None:
+                after(result)
+            return result
+        wrapper.__wrapped__ = func  # type: ignore
+        return wrapper
+
+
+Patch = Tuple[Any, str, Any]
+
+
+def _patches(stats: EngineStats) -> List[Patch]:
+    """
+    Returns: the instrumented attributes to install, as
+    (class, attribute, replacement)
+    """
+    counters: Dict[str, int] = stats.counters
+    patches: List[Patch] = []
+
+    def count(name: str, amount: Callable[[Any], int]) \
+            -> Callable[[Any], None]:
+        def after(result: Any) -> None:
+            counters[name] += amount(result)
+        return after
+
+    for name in PROPERTIES:
+        prop: property = getattr(Reversi, name)
+        assert prop.fget is not None
+        after = None
+        if name == "available_moves":
+            after = count("moves_generated", len)
+        patches.append((Reversi, name, property(
+            stats._timed(f"Reversi.{name}", prop.fget, after=after))))
+
+    def captured(result: List[Tuple[int, int]]) -> None:
+        if stats._apply_depth:
+            counters["flips"] += len(result)
+        elif stats._bot_depth:
+            counters["bot_nodes"] += 1
+
+    def copied(*_: Any) -> None:
+        counters["copies"] += 1
+
+    for name in METHODS:
+        method: Callable[..., Any] = getattr(Reversi, name)
+        if name == "captures":
+            wrapper = _nested(stats, "_scan_depth", stats._timed(
+                f"Reversi.{name}", method, after=captured))
+        elif name == "legal_move":
+            wrapper = _nested(stats, "_scan_depth",
+                              stats._timed(f"Reversi.{name}", method))
+        elif name in ("simulate_moves", "load_game"):
+            wrapper = stats._timed(f"Reversi.{name}", method, before=copied)
+        elif name == "apply_move":
+            wrapper = _nested(stats, "_apply_depth",
+                              stats._timed(f"Reversi.{name}", method))
+        else:
+            wrapper = stats._timed(f"Reversi.{name}", method)
+        patches.append((Reversi, name, wrapper))
+
+    in_board: Callable[..., bool] = Board.in_board
+
+    def scanned(self: Board, pos: Tuple[int, int]) -> bool:
+        if stats._scan_depth:
+            counters["squares_scanned"] += 1
+        return in_board(self, pos)
+    patches.append((Board, "in_board", scanned))
+
+    for bot in BOTS:
+        patches.append((bot, "suggest_move", _nested(
+            stats, "_bot_depth",
+            stats._timed(f"{bot.__name__}.suggest_move", bot.suggest_move))))
+    return patches
+
+
+def _nested(stats: EngineStats, depth: str,
+            func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Returns: a wrapper around func that increments the given depth
+    attribute of stats while func runs
+    """
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        setattr(stats, depth, getattr(stats, depth) + 1)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            setattr(stats, depth, getattr(stats, depth) - 1)
+    return wrapper
+
+
+_active: Optional[EngineStats] = None
+
+
+@contextmanager
+def instrument() -> Iterator[EngineStats]:
+    """
+    Instruments the engine and the bots until the end of the block.
+
+    The methods are replaced on the classes, so calls made by every
+    thread while the block runs are counted (including the background
+    searches of the GUI and the TUI), not only those of the caller.
+
+    Raises:
+        RuntimeError: if instrumentation is already active
+    Returns: the stats collected in the block
+    """
+    global _active  # pylint: disable=global-statement
+    if _active is not None:
+        raise RuntimeError("instrumentation is already active")
+    stats: EngineStats = EngineStats()
+    patches: List[Patch] = _patches(stats)
+    originals: List[Patch] = [(owner, name, owner.__dict__[name])
+                              for owner, name, _ in patches]
+    _active = stats
+    try:
+        for owner, name, replacement in patches:
+            setattr(owner, name, replacement)
+        yield stats
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+        _active = None
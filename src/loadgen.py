@@ -0,0 +1,242 @@
+"""
+Load generator for the Reversi game server
+(and command for running it)
+
+Opens several client connections to a running game server (see
+server.py) and plays games on each of them. Every turn, a client asks
+for the list of moves ("moves"), and then either chooses a move
+itself with RandomBot on a local copy of the game and sends it
+("move"), or asks the server for a bot move ("bot", reported as
+"hint"). The latency of every request is recorded by command type.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import click
+
+from reversi import Reversi
+from bot import RandomBot, percentile
+
+COMMAND_TYPES: Dict[str, str] = {"moves": "moves-list", "move": "move",
+                                 "bot": "hint", "new": "new",
+                                 "close": "close"}
+"""
+Name under which the latency of each server command is reported
+"""
+
+
+class LoadClient:
+    """
+    One simulated client connection.
+    """
+
+    latencies: Dict[str, List[float]]
+    games_played: int
+
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+
+    def __init__(self, latencies: Dict[str, List[float]]):
+        """
+        Constructor
+
+        Args:
+            latencies: where to record the latency of each request
+            (in seconds), by command type
+        """
+        self.latencies = latencies
+        self.games_played = 0
+
+    async def connect(self, host: str, port: int) -> None:
+        """
+        Opens the connection to the server.
+        """
+        self._reader, self._writer = await asyncio.open_connection(
+            host, port, limit=2 ** 20)
+
+    async def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sends a request and waits for the response, recording its latency.
+
+        Raises:
+            RuntimeError: if the server reports an error
+        Returns: the response
+        """
+        start: float = time.perf_counter()
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        line: bytes = await self._reader.readline()
+        self.latencies.setdefault(COMMAND_TYPES[request["cmd"]], []) \
+            .append(time.perf_counter() - start)
+        if not line:
+            raise ConnectionError("the server closed the connection")
+        response: Dict[str, Any] = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(f"{request['cmd']}: {response['error']}")
+        return response
+
+    async def play(self, side: int, players: int, othello: bool,
+                   bot_fraction: float, strategy: str, interval: float,
+                   deadline: float) -> None:
+        """
+        Plays games until the deadline.
+
+        Args:
+            side: number of squares on each side of the board
+            players: number of players
+            othello: whether to start from the Othello configuration
+            bot_fraction: fraction of the moves chosen by the server
+            strategy: bot strategy used by the server
+            interval: minimum number of seconds between two moves
+            deadline: time (as given by time.perf_counter) at which to stop
+        """
+        next_move: float = time.perf_counter()
+        while time.perf_counter() < deadline:
+            new = await self.request({"cmd": "new", "side": side,
+                                      "players": players,
+                                      "othello": othello})
+            game_id: int = new["game"]
+            game: Reversi = Reversi(side, players, othello)
+            bot: RandomBot = RandomBot(game)
+            while not game.done and time.perf_counter() < deadline:
+                delay: float = next_move - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_move = max(next_move + interval, time.perf_counter())
+                await self.request({"cmd": "moves", "game": game_id})
+                if random.random() < bot_fraction:
+                    response = await self.request(
+                        {"cmd": "bot", "game": game_id,
+                         "strategy": strategy})
+                    game.apply_move(tuple(response["pos"]))
+                else:
+                    move = bot.suggest_move()
+                    response = await self.request(
+                        {"cmd": "move", "game": game_id, "pos": move})
+                    game.apply_move(move)
+                if response["done"] != game.done:
+                    raise RuntimeError("the server and client games differ")
+            if game.done:
+                self.games_played += 1
+            await self.request({"cmd": "close", "game": game_id})
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        self._writer.close()
+
+
+async def run_load(host: str, port: int, clients: int, duration: float,
+                   rate: float = 0.0, side: int = 8, players: int = 2,
+                   othello: bool = True, bot_fraction: float = 0.0,
+                   strategy: str = "random") -> Dict[str, Any]:
+    """
+    Runs the load test.
+
+    Args:
+        host: address of the game server
+        port: port of the game server
+        clients: number of client connections
+        duration: length of the test, in seconds
+        rate: target number of moves per second over all clients
+        (0 means as fast as possible)
+        side, players, othello: the kind of games to play
+        bot_fraction: fraction of the moves chosen by the server bot
+        strategy: bot strategy used by the server
+    Returns: the results (see summarize)
+    """
+    latencies: Dict[str, List[float]] = {}
+    load_clients: List[LoadClient] = [LoadClient(latencies)
+                                      for _ in range(clients)]
+    await asyncio.gather(*(c.connect(host, port) for c in load_clients))
+    interval: float = clients / rate if rate > 0 else 0.0
+    start: float = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            c.play(side, players, othello, bot_fraction, strategy,
+                   interval, start + duration)
+            for c in load_clients))
+    finally:
+        for c in load_clients:
+            c.close()
+    elapsed: float = time.perf_counter() - start
+    return summarize(latencies, elapsed,
+                     sum(c.games_played for c in load_clients),
+                     {"clients": clients, "duration": duration, "rate": rate,
+                      "side": side, "players": players, "othello": othello,
+                      "bot_fraction": bot_fraction, "strategy": strategy})
+
+
+def summarize(latencies: Dict[str, List[float]], elapsed: float,
+              games: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summarizes the recorded latencies.
+
+    Args:
+        latencies: latency of every request, by command type
+        elapsed: length of the test, in seconds
+        games: number of games played to the end
+        config: the parameters of the test
+    Returns: the configuration, throughput and latency percentiles
+    (in milliseconds) for every command type
+    """
+    requests: int = sum(len(times) for times in latencies.values())
+    commands: Dict[str, Dict[str, float]] = {}
+    for command, times in sorted(latencies.items()):
+        commands[command] = {
+            "count": len(times),
+            "p50_ms": percentile(times, 50) * 1000,
+            "p99_ms": percentile(times, 99) * 1000,
+            "p999_ms": percentile(times, 99.9) * 1000,
+            "max_ms": max(times) * 1000}
+    return {"config": config, "elapsed": elapsed, "games": games,
+            "requests": requests,
+            "requests_per_second": requests / elapsed if elapsed else 0.0,
+            "commands": commands}
+
+
+@click.command("loadgen")
+@click.option('--host', default="127.0.0.1")
+@click.option('--port', type=int, default=7777)
+@click.option('-c', '--clients', type=int, default=10)
+@click.option('-d', '--duration', type=float, default=10.0,
+              help="Length of the test, in seconds")
+@click.option('-r', '--rate', type=float, default=0.0,
+              help="Target moves per second over all clients (0: no limit)")
+@click.option("-n", "--num-players", default=2)
+@click.option("-s", "--board-size", default=8)
+@click.option("--non-othello", is_flag=True)
+@click.option('--bot-fraction', type=float, default=0.0,
+              help="Fraction of moves requested from the server bot")
+@click.option('--strategy',
+              type=click.Choice(['random', 'smart', 'very-smart']),
+              default='random')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              default=None, help="Write the results to a JSON file")
+def main(host: str, port: int, clients: int, duration: float, rate: float,
+         num_players: int, board_size: int, non_othello: bool,
+         bot_fraction: float, strategy: str, output: Optional[str]) -> None:
+    results: Dict[str, Any] = asyncio.run(run_load(
+        host, port, clients, duration, rate, board_size, num_players,
+        not non_othello, bot_fraction, strategy))
+    print(f"{results['requests']} requests, {results['games']} games " +
+          f"in {results['elapsed']:.1f}s " +
+          f"({results['requests_per_second']:.1f} requests/s)")
+    print()
+    print("Latency (ms)        count      p50      p99     p999      max")
+    for command, row in results["commands"].items():
+        print(f"{command:<12}{row['count']:>13}" +
+              "".join(f"{row[k]:9.3f}"
+                      for k in ("p50_ms", "p99_ms", "p999_ms", "max_ms")))
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Perft for Reversi
+(and command for running it)
+
+Counts the leaf nodes of the game tree to a given depth, to measure
+move-generation speed and to check another move generator against
+Reversi. Players without a move are skipped as in apply_move, so a
+pass is not a ply of its own, and a finished game counts as a leaf
+even if it ends before the given depth.
+"""
+
+import time
+from typing import List, Optional, Tuple
+
+import click
+
+from reversi import Reversi
+
+
+def perft(game: Reversi, depth: int) -> int:
+    """
+    Counts the leaf nodes of the game tree.
+
+    Args:
+        game: the position to start from
+        depth: number of moves to look ahead
+    Returns: the number of positions reached after depth moves (or
+    where the game ended sooner)
+    """
+    if depth == 0 or game.done:
+        return 1
+    moves = game.available_moves
+    if depth == 1:
+        return len(moves)
+    return sum(perft(game.simulate_moves([move]), depth - 1)
+               for move in moves)
+
+
+def divide(game: Reversi, depth: int) -> List[Tuple[Tuple[int, int], int]]:
+    """
+    Counts the leaf nodes below each root move.
+
+    Args:
+        game: the position to start from (not finished)
+        depth: number of moves to look ahead, including the root move
+    Returns: each legal move, with the number of leaves below it
+    """
+    return [(move, perft(game.simulate_moves([move]), depth - 1))
+            for move in game.available_moves]
+
+
+def parse_moves(moves: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Parses a list of moves given as "ROW,COL ROW,COL ...".
+
+    Raises:
+        click.BadParameter: if a move is malformed
+    Returns: the moves
+    """
+    parsed: List[Tuple[int, int]] = []
+    for move in (moves or "").split():
+        try:
+            row, col = move.split(",")
+            parsed.append((int(row), int(col)))
+        except ValueError as e:
+            raise click.BadParameter(f"invalid move {move}") from e
+    return parsed
+
+
+@click.command("perft")
+@click.option("-d", "--depth", type=int, default=5)
+@click.option("-n", "--num-players", default=2)
+@click.option("-s", "--board-size", default=8)
+@click.option("--non-othello", is_flag=True)
+@click.option("-m", "--moves", default=None,
+              help="Moves to play before counting, as \"ROW,COL ROW,COL\"")
+@click.option("--divide", "show_divide", is_flag=True,
+              help="Print the leaf count below each root move")
+def main(depth: int, num_players: int, board_size: int, non_othello: bool,
+         moves: Optional[str], show_divide: bool) -> None:
+    try:
+        game: Reversi = Reversi(board_size, num_players, not non_othello)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+    for move in parse_moves(moves):
+        if game.done or not game.legal_move(move):
+            raise click.BadParameter(f"illegal move {move}")
+        game.apply_move(move)
+
+    start: float = time.perf_counter()
+    if show_divide and depth > 0 and not game.done:
+        nodes: int = 0
+        for (row, col), count in divide(game, depth):
+            print(f"{row},{col}: {count}")
+            nodes += count
+        print()
+    else:
+        nodes = perft(game, depth)
+    elapsed: float = time.perf_counter() - start
+    print(f"Depth {depth}: {nodes} nodes in {elapsed:.3f}s " +
+          f"({nodes / elapsed if elapsed else 0.0:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Position index over a file of game records
+(and command for building and querying one)
+
+The index maps the hash of every position reached in a collection of
+games (see Reversi.position_hash) to the games that reached it. It
+lives in a directory of flat files that are memory-mapped when the
+index is opened, with one row per (position, game) pair, sorted by
+hash:
+
+    index.json   number of games and rows, and whether positions are
+                 canonical
+    hashes.u8    position hash (uint64)
+    games.u4     game number: index of the game in the records file
+    plies.u2     number of moves played before the position
+    moves.u2     move played from the position (row * side + col), or
+                 NO_MOVE for the final position of a game
+    winners.u2   one row per game: bit mask of the players who won
+                 (bit 0 is Player 1), as in replay.py
+
+A lookup is a binary search in hashes.u8, so only a few pages of the
+index are read. The index is built with an external sort: rows are
+collected in runs of bounded size, each run is sorted and written to
+a temporary file, and the runs are then merged block by block.
+
+An index built with canonical=True stores the canonical form of every
+position (see symmetry.py), and moves as squares of that form, so a
+lookup also finds the games that reached a rotation or reflection of
+the position; explore maps the moves back to the position queried.
+"""
+
+import json
+import os
+import tempfile
+import time
+from array import array
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import click
+import numpy as np
+
+from reversi import Reversi, position_hash
+from records import read_games
+from perft import parse_moves
+from symmetry import canonicalize, from_canonical, to_canonical
+
+HEADER_FILE: str = "index.json"
+COLUMNS: Dict[str, str] = {"hashes": "<u8", "games": "<u4", "plies": "<u2",
+                           "moves": "<u2"}
+"""
+Columns of the index, with their numpy dtypes (each is stored in the
+file COLUMN.SUFFIX, where SUFFIX is given by the dtype)
+"""
+WINNERS_FILE: str = "winners.u2"
+
+ROW = np.dtype([(name, dtype) for name, dtype in COLUMNS.items()])
+"""
+One row of the index, as stored in the temporary run files
+"""
+
+NO_MOVE: int = 0xFFFF
+
+MoveStats = Tuple[Optional[Tuple[int, int]], int, int]
+
+
+def column_file(name: str) -> str:
+    """
+    Returns: the name of the file storing a column of the index
+    """
+    return f"{name}.{COLUMNS[name][1:]}"
+
+
+class PositionIndex:
+    """
+    Sorted, memory-mapped index from position hash to the games that
+    reached the position.
+    """
+
+    path: str
+    num_games: int
+    size: int
+    canonical: bool
+    hashes: np.ndarray
+    games: np.ndarray
+    plies: np.ndarray
+    moves: np.ndarray
+    winners: np.ndarray
+
+    @classmethod
+    def open(cls, path: str) -> "PositionIndex":
+        """
+        Opens an index.
+
+        Args:
+            path: directory of the index
+        Returns: the index
+        """
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        index: PositionIndex = cls.__new__(cls)
+        index.path = path
+        index.num_games = header["games"]
+        index.size = header["rows"]
+        index.canonical = header.get("canonical", False)
+        for name, dtype in COLUMNS.items():
+            setattr(index, name, index._map(column_file(name), dtype,
+                                            index.size))
+        index.winners = index._map(WINNERS_FILE, "<u2", index.num_games)
+        return index
+
+    def _map(self, name: str, dtype: str, count: int) -> np.ndarray:
+        """
+        Maps a file of the index into memory (read-only).
+        """
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype,
+                         mode="r", shape=(count,))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(self, position_hash: int) -> slice:
+        """
+        Finds the rows of a position.
+
+        Args:
+            position_hash: hash of the position
+        Returns: the rows of the position, as a slice of the columns
+        (empty if no game reached it)
+        """
+        key = np.uint64(position_hash)
+        return slice(int(np.searchsorted(self.hashes, key, "left")),
+                     int(np.searchsorted(self.hashes, key, "right")))
+
+    def _key(self, game: Reversi) -> Tuple[int, int]:
+        """
+        Returns: the hash under which the position of a game is
+        indexed, and the transform mapping it to its canonical form
+        (0 if the index is not canonical)
+        """
+        if not self.canonical:
+            return game.position_hash(), 0
+        board, transform = canonicalize(game.encode(), game.size)
+        return position_hash(game.size, game.num_players, game.turn,
+                             board), transform
+
+    def games_reaching(self, game: Reversi) -> List[Tuple[int, int]]:
+        """
+        Returns: the (game number, ply) of every game that reached
+        the position of a game (or, in a canonical index, one of its
+        symmetric images)
+        """
+        rows: slice = self.lookup(self._key(game)[0])
+        return list(zip(self.games[rows].tolist(), self.plies[rows].tolist()))
+
+    def explore(self, game: Reversi) -> List[MoveStats]:
+        """
+        Opening explorer: what was played from a position, and how the
+        games ended.
+
+        Args:
+            game: the position
+        Returns: for each move played from the position (None for
+        games that ended there), the number of games and how many of
+        them the player to move won (or tied), most played first
+        """
+        key, transform = self._key(game)
+        rows: slice = self.lookup(key)
+        moves: np.ndarray = self.moves[rows]
+        won: np.ndarray = (self.winners[self.games[rows]] >>
+                           (game.turn - 1)) & 1
+        stats: List[MoveStats] = []
+        for move in np.unique(moves).tolist():
+            played: np.ndarray = moves == move
+            square: Optional[Tuple[int, int]] = None
+            if move != NO_MOVE:
+                square = from_canonical(divmod(move, game.size), game.size,
+                                        transform)
+            stats.append((square, int(played.sum()),
+                          int(won[played].sum())))
+        stats.sort(key=lambda row: -row[1])
+        return stats
+
+
+def _write_run(rows: np.ndarray, directory: str, number: int) -> str:
+    """
+    Sorts a run of rows by hash and writes it to a temporary file.
+
+    Returns: the path of the file
+    """
+    path: str = os.path.join(directory, f"run{number}.bin")
+    rows[np.argsort(rows["hashes"], kind="stable")].tofile(path)
+    return path
+
+
+def _merge_runs(runs: List[str], outputs: Dict[str, BinaryIO],
+                block_size: int) -> None:
+    """
+    Merges sorted run files into the column files, reading at most
+    block_size rows of each run at a time.
+    """
+    sources: List[np.ndarray] = [np.memmap(run, dtype=ROW, mode="r")
+                                 for run in runs if os.path.getsize(run)]
+    positions: List[int] = [0] * len(sources)
+    while True:
+        blocks: List[np.ndarray] = [
+            source[start:start + block_size]
+            for source, start in zip(sources, positions)
+            if start < len(source)]
+        if not blocks:
+            return
+        #every row up to the smallest last hash of the blocks can be
+        # written: the rows after it in any run have larger hashes
+        bound = min(block["hashes"][-1] for block in blocks)
+        parts: List[np.ndarray] = []
+        for k, (source, start) in enumerate(zip(sources, positions)):
+            if start >= len(source):
+                continue
+            block = source[start:start + block_size]
+            count: int = int(np.searchsorted(block["hashes"], bound, "right"))
+            parts.append(block[:count])
+            positions[k] += count
+        merged: np.ndarray = np.concatenate(parts)
+        merged = merged[np.argsort(merged["hashes"], kind="stable")]
+        for name, f in outputs.items():
+            np.ascontiguousarray(merged[name]).tofile(f)
+
+
+def build_index(records_path: str, path: str, run_size: int = 1 << 20,
+                block_size: int = 1 << 16,
+                canonical: bool = False) -> PositionIndex:
+    """
+    Builds an index from a file of game records.
+
+    Args:
+        records_path: file of game records (see records.py)
+        path: directory in which to create the index
+        run_size: maximum number of rows held in memory while
+        collecting positions
+        block_size: number of rows of each run read at a time while
+        merging
+        canonical: whether to index the canonical form of positions
+    Returns: the index
+    """
+    os.makedirs(path, exist_ok=True)
+    rows: np.ndarray = np.empty(run_size, dtype=ROW)
+    filled: int = 0
+    winners: array = array("H")
+    runs: List[str] = []
+    with tempfile.TemporaryDirectory(dir=path) as tmp, \
+            open(records_path, "rb") as f:
+        for number, (side, players, othello, moves) in \
+                enumerate(read_games(f)):
+            game: Reversi = Reversi(side, players, othello)
+            for ply, move in enumerate(moves + [NO_MOVE]):
+                if filled == run_size:
+                    runs.append(_write_run(rows, tmp, len(runs)))
+                    filled = 0
+                if canonical:
+                    board, transform = canonicalize(game.encode(), side)
+                    key: int = position_hash(side, players, game.turn, board)
+                    stored: int = move
+                    if move != NO_MOVE:
+                        row, col = to_canonical(divmod(move, side), side,
+                                                transform)
+                        stored = row * side + col
+                else:
+                    key, stored = game.position_hash(), move
+                rows[filled] = (key, number, ply, stored)
+                filled += 1
+                if move != NO_MOVE:
+                    game.apply_move(divmod(move, side))
+            mask: int = 0
+            for player in game.outcome:
+                mask |= 1 << (player - 1)
+            winners.append(mask)
+        runs.append(_write_run(rows[:filled], tmp, len(runs)))
+
+        outputs: Dict[str, BinaryIO] = {
+            name: open(os.path.join(path, column_file(name)), "wb")
+            for name in COLUMNS}
+        try:
+            _merge_runs(runs, outputs, block_size)
+        finally:
+            for output in outputs.values():
+                output.close()
+    size: int = os.path.getsize(os.path.join(path, column_file("hashes"))) // 8
+    with open(os.path.join(path, WINNERS_FILE), "wb") as f:
+        winners.tofile(f)
+    with open(os.path.join(path, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump({"games": len(winners), "rows": size,
+                   "canonical": canonical,
+                   "records": os.path.abspath(records_path)}, f)
+    return PositionIndex.open(path)
+
+
+@click.group("position-index")
+def main() -> None:
+    """
+    Build and query position indexes over files of game records.
+    """
+
+
+@main.command("build")
+@click.argument("records", type=click.Path(exists=True, dir_okay=False))
+@click.argument("path", type=click.Path(file_okay=False))
+@click.option("--run-size", type=int, default=1 << 20,
+              help="Rows sorted in memory at a time")
+@click.option("--canonical", is_flag=True,
+              help="Index symmetric positions together")
+def build(records: str, path: str, run_size: int, canonical: bool) -> None:
+    start: float = time.perf_counter()
+    index: PositionIndex = build_index(records, path, run_size,
+                                       canonical=canonical)
+    print(f"Indexed {len(index)} positions from {index.num_games} games " +
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+@main.command("query")
+@click.argument("path", type=click.Path(exists=True, file_okay=False))
+@click.option("-n", "--num-players", default=2)
+@click.option("-s", "--board-size", default=8)
+@click.option("--non-othello", is_flag=True)
+@click.option("-m", "--moves", default="",
+              help="Moves leading to the position, as \"ROW,COL ROW,COL\"")
+def query(path: str, num_players: int, board_size: int, non_othello: bool,
+          moves: str) -> None:
+    index: PositionIndex = PositionIndex.open(path)
+    try:
+        game: Reversi = Reversi(board_size, num_players, not non_othello)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+    for move in parse_moves(moves):
+        if game.done or not game.legal_move(move):
+            raise click.BadParameter(f"illegal move {move}")
+        game.apply_move(move)
+    start: float = time.perf_counter()
+    stats: List[MoveStats] = index.explore(game)
+    elapsed: float = time.perf_counter() - start
+    total: int = sum(count for _, count, _ in stats)
+    print(f"{total} games reached the position " +
+          f"(query took {elapsed * 1e6:.0f}us)")
+    for played, count, won in stats:
+        name: str = "end" if played is None else f"{played[0]},{played[1]}"
+        print(f"{name:>6}: {count:>8} games, player {game.turn} won " +
+              f"{won / count:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Profiling for the command-line entry points
+
+Commands that take --profile PATH run under profile(PATH), which
+writes two files when the command ends:
+
+    PATH.pstats     cProfile statistics of the main thread
+                    (read with pstats or snakeviz)
+    PATH.collapsed  stacks sampled from every thread, one
+                    "frame;frame;frame COUNT" line per distinct
+                    stack (the input of flamegraph.pl or speedscope)
+
+A trailing ".pstats" on PATH is ignored, so --profile run and
+--profile run.pstats write the same files.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Callable, Counter as CounterType, Iterator, List, \
+    Optional, Tuple
+
+import click
+
+
+def frame_name(frame: FrameType) -> str:
+    """
+    Returns: the name of a frame in a collapsed stack
+    """
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Thread that periodically records the stack of every other thread.
+    """
+
+    interval: float
+    stacks: CounterType[str]
+
+    _stop: threading.Event
+    _thread: threading.Thread
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Constructor
+
+        Args:
+            interval: seconds between samples
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts sampling.
+        """
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling (and waits for the sampling thread to finish).
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        """
+        Records the current stack of every thread except this one.
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == self._thread.ident:
+                continue
+            stack: List[str] = []
+            current: Optional[FrameType] = frame
+            while current is not None:
+                stack.append(frame_name(current))
+                current = current.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        """
+        Samples until stopped (in the sampling thread).
+        """
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def write(self, path: str) -> None:
+        """
+        Writes the sampled stacks in collapsed format.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def output_paths(path: str) -> Tuple[str, str]:
+    """
+    Returns: the paths of the .pstats and .collapsed files written
+    for a --profile PATH
+    """
+    if path.endswith(".pstats"):
+        path = path[:-len(".pstats")]
+    return path + ".pstats", path + ".collapsed"
+
+
+@contextmanager
+def profile(path: Optional[str], interval: float = 0.005) -> Iterator[None]:
+    """
+    Profiles the block, if a path is given.
+
+    Args:
+        path: where to write the profiles (see output_paths), or None
+        to run the block without profiling
+        interval: seconds between stack samples
+    """
+    if path is None:
+        yield
+        return
+    #cProfile is only loaded when profiling is requested
+    import cProfile  # pylint: disable=import-outside-toplevel
+    pstats_path, collapsed_path = output_paths(path)
+    profiler = cProfile.Profile()
+    sampler: StackSampler = StackSampler(interval)
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        profiler.dump_stats(pstats_path)
+        sampler.write(collapsed_path)
+        print(f"Profile written to {pstats_path} and {collapsed_path}",
+              file=sys.stderr)
+
+
+def profile_option(command: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Adds the --profile PATH option to a click command.
+    """
+    return click.option(
+        "--profile", "profile_path", type=click.Path(dir_okay=False),
+        default=None,
+        help="Write a cProfile .pstats file and collapsed stacks")(command)
@@ -0,0 +1,308 @@
+"""
+Compact binary format for positions and game records
+
+Position (see pack_position):
+    side, players, turn    one byte each
+    cells                  4 bits per square, row-major, two squares
+                           per byte (the first in the high bits), each
+                           the number of the player with a piece on the
+                           square, or 0 if it is empty
+
+Game record (see pack_game):
+    side, players, flags   one byte each (flags: 1 if the game started
+                           from the Othello configuration)
+    count                  number of moves, as a varint
+    moves                  each move as the index row * side + col of
+                           its square: one byte if the board has at most
+                           256 squares, a varint otherwise
+
+Players without a move are skipped as in Reversi.apply_move, so
+passes are implied and not stored. Varints are unsigned LEB128 (7 bits
+per byte, least significant first, high bit set on all but the last
+byte).
+
+A file of records starts with a 4-byte magic number (POSITIONS_MAGIC
+or GAMES_MAGIC) followed by the records back to back. The read_*
+functions parse files in large chunks and yield one record at a time,
+so files with millions of records are never loaded whole.
+"""
+
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+POSITIONS_MAGIC: bytes = b"RVP1"
+GAMES_MAGIC: bytes = b"RVG1"
+
+CHUNK_SIZE: int = 1 << 20
+"""
+Number of bytes read from a file at a time
+"""
+
+Position = Tuple[int, int, int, bytes]
+"""
+A position: side, players, turn and the board, one byte per square
+(as returned by Reversi.encode)
+"""
+
+GameRecord = Tuple[int, int, bool, List[int]]
+"""
+A game: side, players, whether it started from the Othello
+configuration, and the index (row * side + col) of each move
+"""
+
+_UNPACKED: List[bytes] = [bytes([b >> 4, b & 15]) for b in range(256)]
+"""
+The two squares stored in each possible byte of packed cells
+"""
+
+
+def pack_cells(board: bytes) -> bytes:
+    """
+    Returns: the squares of a board (one byte per square) packed
+    4 bits per square
+    """
+    if len(board) % 2:
+        board += b"\0"
+    return bytes([(board[i] << 4) | board[i + 1]
+                  for i in range(0, len(board), 2)])
+
+
+def unpack_cells(data: bytes, count: int) -> bytes:
+    """
+    Returns: the first count squares of packed cells, one byte per
+    square
+    """
+    return b"".join([_UNPACKED[b] for b in data])[:count]
+
+
+def position_size(side: int) -> int:
+    """
+    Returns: the size in bytes of a packed position
+    """
+    return 3 + (side * side + 1) // 2
+
+
+def pack_position(side: int, players: int, turn: int, board: bytes) -> bytes:
+    """
+    Packs a position.
+
+    Args:
+        side: number of squares on each side of the board
+        players: number of players
+        turn: player to move
+        board: the board, one byte per square (see Reversi.encode)
+    Raises:
+        ValueError: if a value does not fit in the format
+    Returns: the packed position
+    """
+    if not 0 < side < 256 or not 0 < players < 16 or not 0 < turn < 16:
+        raise ValueError("The position does not fit in the format.")
+    if len(board) != side * side:
+        raise ValueError("The size of the board is inconsistent with side.")
+    return bytes([side, players, turn]) + pack_cells(board)
+
+
+def unpack_position(data: bytes) -> Position:
+    """
+    Unpacks a position.
+
+    Raises:
+        ValueError: if data is not a packed position
+    Returns: the position
+    """
+    if len(data) < 3 or len(data) != position_size(data[0]):
+        raise ValueError("Truncated position.")
+    side, players, turn = data[0], data[1], data[2]
+    if not 0 < side < 256 or not 0 < players < 16 or not 0 < turn <= players:
+        raise ValueError("Invalid position header.")
+    return side, players, turn, unpack_cells(data[3:], side * side)
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    """
+    Appends an unsigned varint to out.
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """
+    Reads an unsigned varint.
+
+    Raises:
+        IndexError: if data ends in the middle of the varint
+    Returns: the value, and the offset just after it
+    """
+    value: int = 0
+    shift: int = 0
+    while True:
+        b: int = data[offset]
+        offset += 1
+        value |= (b & 0x7F) << shift
+        if b < 0x80:
+            return value, offset
+        shift += 7
+
+
+def pack_game(side: int, players: int, othello: bool,
+              moves: Iterable[int]) -> bytes:
+    """
+    Packs a game record.
+
+    Args:
+        side: number of squares on each side of the board
+        players: number of players
+        othello: whether the game started from the Othello configuration
+        moves: index (row * side + col) of each move
+    Raises:
+        ValueError: if a value does not fit in the format
+    Returns: the packed record
+    """
+    if not 0 < side < 256 or not 0 < players < 256:
+        raise ValueError("The game does not fit in the format.")
+    moves = list(moves)
+    out: bytearray = bytearray([side, players, int(othello)])
+    write_varint(out, len(moves))
+    if side * side <= 256:
+        out += bytes(moves)
+    else:
+        for move in moves:
+            write_varint(out, move)
+    return bytes(out)
+
+
+def unpack_game(data: bytes, offset: int = 0) -> Tuple[GameRecord, int]:
+    """
+    Unpacks a game record.
+
+    Args:
+        data: bytes containing the record
+        offset: where the record starts in data
+    Raises:
+        IndexError: if data ends in the middle of the record
+    Returns: the record, and the offset just after it
+    """
+    side, players, flags = data[offset], data[offset + 1], data[offset + 2]
+    count, offset = read_varint(data, offset + 3)
+    moves: List[int]
+    if side * side <= 256:
+        if offset + count > len(data):
+            raise IndexError("truncated game record")
+        moves = list(data[offset:offset + count])
+        offset += count
+    else:
+        moves = []
+        for _ in range(count):
+            move, offset = read_varint(data, offset)
+            moves.append(move)
+    return (side, players, bool(flags & 1), moves), offset
+
+
+def write_positions(f: BinaryIO, positions: Iterable[Position]) -> int:
+    """
+    Writes a file of positions.
+
+    Args:
+        f: file opened for writing in binary mode
+        positions: the positions (may be a generator)
+    Returns: the number of positions written
+    """
+    f.write(POSITIONS_MAGIC)
+    count: int = 0
+    for position in positions:
+        f.write(pack_position(*position))
+        count += 1
+    return count
+
+
+def write_games(f: BinaryIO, games: Iterable[GameRecord]) -> int:
+    """
+    Writes a file of game records.
+
+    Args:
+        f: file opened for writing in binary mode
+        games: the game records (may be a generator)
+    Returns: the number of records written
+    """
+    f.write(GAMES_MAGIC)
+    count: int = 0
+    for game in games:
+        f.write(pack_game(*game))
+        count += 1
+    return count
+
+
+def _check_magic(f: BinaryIO, magic: bytes) -> None:
+    """
+    Reads the magic number at the start of a file.
+
+    Raises:
+        ValueError: if the file does not start with magic
+    """
+    if f.read(len(magic)) != magic:
+        raise ValueError("Not a file of the expected kind of records.")
+
+
+def read_positions(f: BinaryIO) -> Iterator[Position]:
+    """
+    Reads a file of positions, one at a time.
+
+    Args:
+        f: file opened for reading in binary mode
+    Raises:
+        ValueError: if the file is not a file of positions, or ends in
+        the middle of a position
+    Returns: an iterator over the positions
+    """
+    _check_magic(f, POSITIONS_MAGIC)
+    buffer: bytes = b""
+    offset: int = 0
+    while True:
+        if offset < len(buffer):
+            size: int = position_size(buffer[offset])
+            if offset + size <= len(buffer):
+                yield unpack_position(buffer[offset:offset + size])
+                offset += size
+                continue
+        chunk: bytes = f.read(CHUNK_SIZE)
+        if not chunk:
+            if offset < len(buffer):
+                raise ValueError("Truncated position.")
+            return
+        buffer = buffer[offset:] + chunk
+        offset = 0
+
+
+def read_games(f: BinaryIO) -> Iterator[GameRecord]:
+    """
+    Reads a file of game records, one at a time.
+
+    Args:
+        f: file opened for reading in binary mode
+    Raises:
+        ValueError: if the file is not a file of game records, or ends
+        in the middle of a record
+    Returns: an iterator over the records
+    """
+    _check_magic(f, GAMES_MAGIC)
+    buffer: bytes = b""
+    offset: int = 0
+    while True:
+        if offset < len(buffer):
+            try:
+                record, end = unpack_game(buffer, offset)
+            except IndexError:
+                pass
+            else:
+                yield record
+                offset = end
+                continue
+        chunk: bytes = f.read(CHUNK_SIZE)
+        if not chunk:
+            if offset < len(buffer):
+                raise ValueError("Truncated game record.")
+            return
+        buffer = buffer[offset:] + chunk
+        offset = 0
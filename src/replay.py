@@ -0,0 +1,357 @@
+"""
+Replay buffer for Reversi positions
+(and command for filling one with self-play games)
+
+The buffer lives in a directory of numpy.memmap files, so it can be
+much larger than the available RAM. Positions are stored with the
+same encoding as Reversi.encode (one byte per square, 0 for empty,
+otherwise the player number), so samples can be used directly
+without going through the grid property.
+"""
+
+import json
+import os
+from typing import List, Literal, Optional, Tuple
+
+import click
+import numpy as np
+
+from reversi import Reversi
+from bot import ReversiBot
+
+HEADER_FILE: str = "buffer.json"
+POSITIONS_FILE: str = "positions.u8"
+META_FILE: str = "meta.i32"
+PRIORITIES_FILE: str = "priorities.f64"
+
+META_COLUMNS: List[str] = ["turn", "move", "winners", "ply"]
+"""
+Columns of the per-position metadata array:
+- turn: player to move in the position
+- move: move played from the position, as row * side + col
+- winners: bit mask of the players that won the game (bit 0 is Player 1)
+- ply: number of moves played before the position
+"""
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of positions backed by memory-mapped files.
+
+    Once the buffer is full, new positions overwrite the oldest ones.
+    Sampling reads only the requested rows from disk.
+    """
+
+    path: str
+    side: int
+    players: int
+    capacity: int
+    size: int
+    cursor: int
+    max_priority: float
+    positions: np.memmap
+    meta: np.memmap
+    priorities: np.memmap
+
+    def __init__(self, path: str, side: int, players: int,
+                 capacity: int) -> None:
+        """
+        Constructor. Creates a new, empty buffer (use ReplayBuffer.open
+        to reopen an existing one).
+
+        Args:
+            path: Directory in which to store the buffer files
+            side: Number of squares on each side of the board
+            players: Number of players
+            capacity: Maximum number of positions in the buffer
+        Raises:
+            ValueError: If the capacity is not positive
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of the buffer must be positive.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.side = side
+        self.players = players
+        self.capacity = capacity
+        self.size = 0
+        self.cursor = 0
+        self.max_priority = 1.0
+        self._map_files("w+")
+        self._write_header()
+
+    @classmethod
+    def open(cls, path: str) -> "ReplayBuffer":
+        """
+        Reopens an existing buffer.
+
+        Args:
+            path: Directory in which the buffer files are stored
+        Returns: the buffer
+        """
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        buffer: ReplayBuffer = cls.__new__(cls)
+        buffer.path = path
+        buffer.side = header["side"]
+        buffer.players = header["players"]
+        buffer.capacity = header["capacity"]
+        buffer.size = header["size"]
+        buffer.cursor = header["cursor"]
+        buffer.max_priority = header["max_priority"]
+        buffer._map_files("r+")
+        return buffer
+
+    def _map_files(self, mode: Literal["r", "r+", "w+"]) -> None:
+        """
+        Maps the buffer files into memory.
+
+        Args:
+            mode: numpy.memmap mode ("w+" to create, "r+" to reopen)
+        """
+        self.positions = np.memmap(
+            os.path.join(self.path, POSITIONS_FILE), dtype=np.uint8,
+            mode=mode, shape=(self.capacity, self.side, self.side))
+        self.meta = np.memmap(
+            os.path.join(self.path, META_FILE), dtype=np.int32,
+            mode=mode, shape=(self.capacity, len(META_COLUMNS)))
+        #sum tree: node i has children 2i and 2i + 1,
+        # leaves (one per position) are at capacity + index
+        self.priorities = np.memmap(
+            os.path.join(self.path, PRIORITIES_FILE), dtype=np.float64,
+            mode=mode, shape=(2 * self.capacity,))
+
+    def _write_header(self) -> None:
+        """
+        Writes the header file, which records the buffer dimensions
+        and how much of it is in use.
+        """
+        header = {"side": self.side, "players": self.players,
+                  "capacity": self.capacity, "size": self.size,
+                  "cursor": self.cursor, "max_priority": self.max_priority}
+        with open(os.path.join(self.path, HEADER_FILE), "w",
+                  encoding="utf-8") as f:
+            json.dump(header, f)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> "ReplayBuffer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def append(self, position: bytes, turn: int, move: int = -1,
+               winners: int = 0, ply: int = 0,
+               priority: Optional[float] = None) -> int:
+        """
+        Adds a position to the buffer.
+
+        Args:
+            position: Position, as returned by Reversi.encode
+            turn: Player to move in the position
+            move: Move played from the position (row * side + col),
+            or -1 if unknown
+            winners: Bit mask of the players who won the game
+            ply: Number of moves played before the position
+            priority: Sampling priority. New positions get the
+            highest priority seen so far by default.
+        Raises:
+            ValueError: If the position does not match the board size
+        Returns: the index at which the position was stored
+        """
+        if len(position) != self.side * self.side:
+            raise ValueError("The position is inconsistent with the size " +
+                             "of the buffer.")
+        index: int = self.cursor
+        self.positions[index] = np.frombuffer(position, dtype=np.uint8) \
+            .reshape(self.side, self.side)
+        self.meta[index] = (turn, move, winners, ply)
+        self.update_priority(index,
+                             self.max_priority if priority is None
+                             else priority)
+        self.cursor = (self.cursor + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return index
+
+    def append_game(self, game: Reversi, moves: List[Tuple[int, int]]) \
+            -> None:
+        """
+        Replays a game from the given starting position and adds
+        every position reached (before each move) to the buffer,
+        labelled with the final outcome of the game.
+
+        Args:
+            game: Starting position (not modified)
+            moves: Moves played from the starting position
+        """
+        sim_game: Reversi = game.simulate_moves([])
+        records: List[Tuple[bytes, int, int, int]] = []
+        for ply, (i, j) in enumerate(moves):
+            records.append((sim_game.encode(), sim_game.turn,
+                            i * self.side + j, ply))
+            sim_game.apply_move((i, j))
+        winners: int = 0
+        for player in sim_game.outcome:
+            winners |= 1 << (player - 1)
+        for position, turn, move, ply in records:
+            self.append(position, turn, move, winners, ply)
+
+    def update_priority(self, index: int, priority: float) -> None:
+        """
+        Changes the sampling priority of a position.
+
+        Args:
+            index: Index of the position in the buffer
+            priority: New (non-negative) priority
+        """
+        node: int = index + self.capacity
+        change: float = priority - self.priorities[node]
+        while node >= 1:
+            self.priorities[node] += change
+            node //= 2
+        self.max_priority = max(self.max_priority, priority)
+
+    def sample(self, batch_size: int,
+               rng: Optional[np.random.Generator] = None) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Samples positions uniformly at random (with replacement).
+
+        Args:
+            batch_size: Number of positions to sample
+            rng: Random number generator to use
+        Raises:
+            ValueError: If the buffer is empty
+        Returns: the sampled indices, positions (batch_size x side x side)
+        and metadata rows (batch_size x len(META_COLUMNS))
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty buffer.")
+        if rng is None:
+            rng = np.random.default_rng()
+        indices: np.ndarray = np.sort(rng.integers(0, self.size, batch_size))
+        return indices, self.positions[indices], self.meta[indices]
+
+    def sample_prioritized(self, batch_size: int,
+                           rng: Optional[np.random.Generator] = None) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Samples positions with probability proportional to their
+        priority (with replacement), by walking down the sum tree.
+
+        Args:
+            batch_size: Number of positions to sample
+            rng: Random number generator to use
+        Raises:
+            ValueError: If the buffer is empty or all priorities are 0
+        Returns: the sampled indices, positions and metadata rows
+        (as in sample)
+        """
+        total: float = float(self.priorities[1])
+        if self.size == 0 or total <= 0:
+            raise ValueError("Cannot sample from an empty buffer.")
+        if rng is None:
+            rng = np.random.default_rng()
+        values: np.ndarray = rng.random(batch_size) * total
+        nodes: np.ndarray = np.ones(batch_size, dtype=np.int64)
+        inner: np.ndarray = nodes < self.capacity
+        while inner.any():
+            left: np.ndarray = 2 * nodes[inner]
+            left_sums: np.ndarray = self.priorities[left]
+            go_right: np.ndarray = values[inner] >= left_sums
+            values[inner] -= np.where(go_right, left_sums, 0)
+            nodes[inner] = left + go_right
+            inner = nodes < self.capacity
+        #guard against floating point drift landing on an unused slot
+        indices: np.ndarray = np.minimum(nodes - self.capacity, self.size - 1)
+        indices.sort()
+        return indices, self.positions[indices], self.meta[indices]
+
+    def flush(self) -> None:
+        """
+        Writes all pending changes to disk.
+        """
+        self.positions.flush()
+        self.meta.flush()
+        self.priorities.flush()
+        self._write_header()
+
+    def close(self) -> None:
+        """
+        Flushes the buffer and releases the memory maps (they are
+        unmapped once no array taken from them is still in use, so the
+        buffer cannot be used after this).
+        """
+        self.flush()
+        del self.positions, self.meta, self.priorities
+
+
+def self_play(buffer: ReplayBuffer, num_games: int, strategy: str,
+              othello: bool) -> None:
+    """
+    Plays games where every player uses the same bot strategy, and
+    adds every position reached to the buffer.
+
+    Args:
+        buffer: The buffer to fill
+        num_games: Number of games to play
+        strategy: Bot strategy ("random", "smart" or "very-smart")
+        othello: Whether to start from the Othello configuration
+    """
+    for _ in range(num_games):
+        start: Reversi = Reversi(buffer.side, buffer.players, othello)
+        game: Reversi = start.simulate_moves([])
+        game_bot: ReversiBot = ReversiBot(game)
+        moves: List[Tuple[int, int]] = []
+        while not game.done:
+            move: Tuple[int, int] = game_bot.hint(strategy)
+            moves.append(move)
+            game.apply_move(move)
+        buffer.append_game(start, moves)
+
+
+@click.command("replay")
+@click.argument("path")
+@click.option("-g", "--num-games", type=int, default=100)
+@click.option("-n", "--num-players", type=int, default=None,
+              help="Number of players (default: 2)")
+@click.option("-s", "--board-size", type=int, default=None,
+              help="Size of the board (default: 8)")
+@click.option("-c", "--capacity", type=int, default=None,
+              help="Capacity of a new buffer (default: 1000000)")
+@click.option("--non-othello", is_flag=True)
+@click.option("--strategy",
+              type=click.Choice(["random", "smart", "very-smart"]),
+              default="random")
+def main(path: str, num_games: int, num_players: Optional[int],
+         board_size: Optional[int], capacity: Optional[int],
+         non_othello: bool, strategy: str) -> None:
+    """
+    Appends self-play positions to the buffer at PATH (creating it
+    if it does not exist). The options given for an existing buffer
+    must match it.
+    """
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+        buffer: ReplayBuffer = ReplayBuffer.open(path)
+        for option, given, value in [("--num-players", num_players,
+                                      buffer.players),
+                                     ("--board-size", board_size,
+                                      buffer.side),
+                                     ("--capacity", capacity,
+                                      buffer.capacity)]:
+            if given is not None and given != value:
+                buffer.close()
+                raise click.BadParameter(
+                    f"the buffer at {path} has {option} {value}, not {given}")
+    else:
+        buffer = ReplayBuffer(path, board_size or 8, num_players or 2,
+                              capacity or 1_000_000)
+    with buffer:
+        self_play(buffer, num_games, strategy, not non_othello)
+        print(f"{len(buffer)} positions in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,8 @@ Contains a base class (ReversiBase). You must implement
 a Reversi class that inherits from this base class.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Reversible, Tuple, Optional
-from copy import deepcopy
-from termcolor import colored, cprint
+from typing import Any, Callable, List, Dict, Reversible, Tuple, Optional
+from records import pack_position, unpack_position
 
 COLORS: List[str] = ["", "dark_grey", "white", "red", "blue", "green",
                      "yellow", "magenta", "cyan", "light_cyan"]
@@ -26,6 +25,35 @@ Type for representing lists of moves on the board.
 """
 
 
+_blake2b: Optional[Callable[..., Any]] = None
+"""
+hashlib.blake2b, imported by the first call to position_hash (hashlib
+loads OpenSSL, which most uses of the engine never need)
+"""
+
+
+def position_hash(side: int, players: int, turn: int, board: bytes) -> int:
+    """
+    Returns a 64-bit hash identifying a position. Unlike hash(), it
+    is the same in every process, so it can be stored on disk or
+    shared between processes.
+    Args:
+        side: Number of squares on each side of the board
+        players: Number of players
+        turn: The player number of the player that would make the
+        next move
+        board: The board, one byte per square (see Reversi.encode)
+    Returns: the hash
+    """
+    global _blake2b  # pylint: disable=global-statement
+    if _blake2b is None:
+        from hashlib import blake2b  # pylint: disable=import-outside-toplevel
+        _blake2b = blake2b
+    header: bytes = bytes([side, players, turn])
+    return int.from_bytes(_blake2b(header + board, digest_size=8).digest(),
+                          "little")
+
+
 class ReversiBase(ABC):
     """
     Abstract base class for the game of Reversi
@@ -261,6 +289,9 @@ class Piece:
         """
         Returns: a colored string representation of the piece.
         """
+        #termcolor is only needed for display, so it is imported here
+        # rather than when the engine is loaded
+        from termcolor import colored  # pylint: disable=import-outside-toplevel
         return colored(str(self.name), COLORS[self.name])
 
     def __repr__(self) -> str:
@@ -271,6 +302,69 @@ class Piece:
 
 PieceBoardType = List[List[Optional[Piece]]]
 
+# Characters for drawing the board
+WALL_CHARS: Dict[str, str] = {
+    "H_WALL": "─", "V_WALL": "│", "HV_WALL": "┼",
+    "NW_CORNER": "┌", "NE_CORNER": "┐", "SW_CORNER": "└", "SE_CORNER": "┘",
+    "VE_WALL": "├", "VW_WALL": "┤", "HS_WALL": "┬", "HN_WALL": "┴",
+    "N_WALL": "╵", "E_WALL": "╶", "S_WALL": "╷", "W_WALL": "╴"
+}
+
+#boolean representations of WALL_CHARS
+CLOCK_CHARS: Dict[Tuple[bool, bool, bool, bool], str] = {
+    (False, False, False, False): " ",
+    (False, False, False, True): WALL_CHARS["W_WALL"],
+    (False, False, True, False): WALL_CHARS["S_WALL"],
+    (False, False, True, True): WALL_CHARS["NE_CORNER"],
+    (False, True, False, False): WALL_CHARS["E_WALL"],
+    (False, True, False, True): WALL_CHARS["H_WALL"],
+    (False, True, True, False): WALL_CHARS["NW_CORNER"],
+    (False, True, True, True): WALL_CHARS["HS_WALL"],
+    (True, False, False, False): WALL_CHARS["N_WALL"],
+    (True, False, False, True): WALL_CHARS["SE_CORNER"],
+    (True, False, True, False): WALL_CHARS["V_WALL"],
+    (True, False, True, True): WALL_CHARS["VW_WALL"],
+    (True, True, False, False): WALL_CHARS["SW_CORNER"],
+    (True, True, False, True): WALL_CHARS["HN_WALL"],
+    (True, True, True, False): WALL_CHARS["VE_WALL"],
+    (True, True, True, True): WALL_CHARS["HV_WALL"]
+}
+
+_BOARD_TEMPLATES: Dict[int, List[str]] = {}
+
+
+def board_template(side: int) -> List[str]:
+    """
+    Returns the lines of an empty board drawn with WALL_CHARS (the
+    square in row i and column j is at line 2i + 1, column 2j + 1).
+    Templates are built once per board size.
+    Args:
+        side: Number of squares on each side of the board
+    Returns: the lines of the empty board
+    """
+    if side in _BOARD_TEMPLATES:
+        return _BOARD_TEMPLATES[side]
+
+    #first construct an empty grid to fill in
+    n: int = 2 * side + 1
+    m: int = n - 1
+    str_grid: List[List[str]] = [[" "] * n for _ in range(n)]
+
+    #fill in the grid
+    for k, grid_row in enumerate(str_grid):
+        for l, entry in enumerate(grid_row):
+            #draw the boundaries of the squares in diagonal directions
+            if k % 2 == 0 and l % 2 == 0:
+                str_grid[k][l] = CLOCK_CHARS[(k > 0, l < m, k < m, l > 0)]
+            #draw the boundaries of the squares in cardinal directions
+            elif k % 2 == 0:
+                str_grid[k][l] = CLOCK_CHARS[(False, True, False, True)]
+            elif l % 2 == 0:
+                str_grid[k][l] = CLOCK_CHARS[(True, False, True, False)]
+
+    _BOARD_TEMPLATES[side] = ["".join(grid_row) for grid_row in str_grid]
+    return _BOARD_TEMPLATES[side]
+
 class Board:
     """
     Class to represent a game board.
@@ -302,62 +396,14 @@ class Board:
         """
         Returns: String representation of the board
         """
-        # Characters for drawing the board
-        WALL_CHARS = {
-            "H_WALL": "─", "V_WALL": "│", "HV_WALL": "┼",
-            "NW_CORNER": "┌", "NE_CORNER": "┐", "SW_CORNER": "└", "SE_CORNER": "┘",
-            "VE_WALL": "├", "VW_WALL": "┤", "HS_WALL": "┬", "HN_WALL": "┴",
-            "N_WALL": "╵", "E_WALL": "╶", "S_WALL": "╷", "W_WALL": "╴"
-        }
-
-        #boolean representations of WALL_CHARS
-        CLOCK_CHARS = {
-            (False, False, False, False): " ",
-            (False, False, False, True): WALL_CHARS["W_WALL"],
-            (False, False, True, False): WALL_CHARS["S_WALL"],
-            (False, False, True, True): WALL_CHARS["NE_CORNER"],
-            (False, True, False, False): WALL_CHARS["E_WALL"],
-            (False, True, False, True): WALL_CHARS["H_WALL"],
-            (False, True, True, False): WALL_CHARS["NW_CORNER"],
-            (False, True, True, True): WALL_CHARS["HS_WALL"],
-            (True, False, False, False): WALL_CHARS["N_WALL"],
-            (True, False, False, True): WALL_CHARS["SE_CORNER"],
-            (True, False, True, False): WALL_CHARS["V_WALL"],
-            (True, False, True, True): WALL_CHARS["VW_WALL"],
-            (True, True, False, False): WALL_CHARS["SW_CORNER"],
-            (True, True, False, True): WALL_CHARS["HN_WALL"],
-            (True, True, True, False): WALL_CHARS["VE_WALL"],
-            (True, True, True, True): WALL_CHARS["HV_WALL"]
-        }
-
-        #first construct an empty grid to fill in
-        n: int = 2 * len(self.grid) + 1
-        str_grid: List[List[str]] = [[" "] * n for _ in range(n)]
-
-        #fill in the grid
-        for k, grid_row in enumerate(str_grid):
-            for l, entry in enumerate(grid_row):
-                #draw the boundaries of the squares in diagonal directions
-                if k % 2 == 0 and l % 2 == 0:
-                    m = n - 1
-                    str_grid[k][l] = CLOCK_CHARS[(k > 0, l < m, k < m, l > 0)]
-                #draw the boundaries of the squares in cardinal directions
-                elif k % 2 == 0:
-                    str_grid[k][l] = CLOCK_CHARS[(False, True, False, True)]
-                elif l % 2 == 0:
-                    str_grid[k][l] = CLOCK_CHARS[(True, False, True, False)]
-                #fill in the pieces
-                else:
-                    i = (k - 1) // 2
-                    j = (l - 1) // 2
-                    if not self.grid[i][j] is None:
-                        str_grid[k][l] = str(self.grid[i][j])
-
-        #turn str_grid into a string
-        rv: List[str] = [""] * n
-        for k, grid_row in enumerate(str_grid):
-            rv[k] = "".join(grid_row)
-        return "\n".join(rv)
+        #copy the cached empty board, and fill in the pieces
+        str_grid: List[List[str]] = [list(row) for row in
+                                     board_template(len(self.grid))]
+        for i, row in enumerate(self.grid):
+            for j, square in enumerate(row):
+                if square is not None:
+                    str_grid[2 * i + 1][2 * j + 1] = str(square)
+        return "\n".join(["".join(row) for row in str_grid])
 
 
 class Reversi(ReversiBase):
@@ -686,7 +732,7 @@ class Reversi(ReversiBase):
         self._board = Board(grid)
 
         #check if the loaded game is done
-        sim_game: Reversi = deepcopy(self)
+        sim_game: Reversi = self._clone()
         next_player = sim_game.turn
         while sim_game.available_moves == []:
             sim_game._total_turns += 1
@@ -728,7 +774,7 @@ class Reversi(ReversiBase):
         the method was called on, reflecting the state
         of the game after applying the provided moves.
         """
-        sim_game: Reversi = deepcopy(self)
+        sim_game: Reversi = self._clone()
         for i, move in enumerate(moves):
             if sim_game.done:
                 return sim_game
@@ -737,5 +783,80 @@ class Reversi(ReversiBase):
             sim_game.apply_move(move)
         return sim_game
 
+    def _clone(self) -> "Reversi":
+        """
+        Returns a copy of the game that can be changed without
+        changing this one. Pieces are never modified (a flip replaces
+        the piece), so only the rows of the board are copied.
+        """
+        clone: Reversi = Reversi.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        board: Board = Board.__new__(Board)
+        board.grid = [row[:] for row in self._board.grid]
+        clone._board = board
+        return clone
+
+    def encode(self) -> bytes:
+        """
+        Returns the board as one byte per square, in row-major order.
+        Each byte is the number of the player with a piece on that
+        square, or 0 if the square is empty (the same numbering
+        used by the grid property, without building the list of lists).
+        """
+        return bytes([0 if square is None else square.name
+                      for row in self._board.grid for square in row])
+
+    def position_hash(self) -> int:
+        """
+        Returns a 64-bit hash identifying the position (see the
+        position_hash function).
+        """
+        return position_hash(self._side, self._players, self.turn,
+                             self.encode())
+
+    def load_encoded(self, turn: int, data: bytes) -> None:
+        """
+        Loads the state of a game from the format returned by encode,
+        replacing the current state of the game.
+        Args:
+            turn: The player number of the player that
+            would make the next move ("whose turn is it?")
+            data: The board, one byte per square (see encode)
+        Raises:
+             ValueError: As in load_game, or if the length of data
+             is inconsistent with the _side attribute.
+        Returns: None
+        """
+        n: int = self._side
+        if len(data) != n * n:
+            raise ValueError("The size of the grid is inconsistent with the " +
+                             "size property.")
+        self.load_game(turn, [[square or None for square in data[i:i + n]]
+                              for i in range(0, n * n, n)])
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns the position in the compact binary format (the side,
+        number of players and turn, then 4 bits per square; see
+        records.pack_position).
+        """
+        return pack_position(self._side, self._players, self.turn,
+                             self.encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Reversi":
+        """
+        Builds a game from a position returned by to_bytes.
+        Args:
+            data: The packed position
+        Raises:
+             ValueError: If data is not a valid position
+        Returns: The game
+        """
+        side, players, turn, board = unpack_position(data)
+        game: Reversi = cls(side, players, False)
+        game.load_encoded(turn, board)
+        return game
+
     def __str__(self):
         return str(self._board)
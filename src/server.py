@@ -0,0 +1,469 @@
+"""
+Reversi game server
+(and command for running it)
+
+Hosts many concurrent games over TCP. Clients send one JSON request
+per line and get one JSON response per line. Every request has a
+"cmd" field, and may have an "id" field, which is copied into the
+response.
+
+Commands:
+    {"cmd": "new", "side": 8, "players": 2, "othello": true}
+    {"cmd": "moves", "game": ID}
+    {"cmd": "move", "game": ID, "pos": [ROW, COL]}
+    {"cmd": "bot", "game": ID, "strategy": "random"|"smart"|"very-smart"}
+    {"cmd": "grid", "game": ID}
+    {"cmd": "grid", "game": ID, "since": VERSION}
+    {"cmd": "close", "game": ID}
+    {"cmd": "stats"}
+
+Successful responses have "ok": true, failed ones have "ok": false and
+an "error" message. Responses that describe a game include its
+"turn", "done", "outcome" and "version" (the number of moves played).
+"move" and "bot" responses list the squares that changed as
+[ROW, COL, PLAYER] triples, and "grid" with "since" returns the
+squares that changed after the given version.
+
+Games are kept between requests in a compact form (the encoded board
+and the list of moves). Everything that runs the engine (creating a
+game, listing and playing moves, replaying a game for "since", and
+bot moves) is done in a bounded pool of worker processes, so the
+event loop never blocks on a board scan or a search, whatever the
+size of the board.
+"""
+
+import asyncio
+import json
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import click
+
+from reversi import Reversi, BoardGridType
+from bot import ReversiBot
+
+STRATEGIES: List[str] = ["random", "smart", "very-smart"]
+
+MAX_SIDE: int = 64
+"""
+Largest board side accepted by "new" (moves are stored as square
+indices in an array of uint16)
+"""
+
+Response = Dict[str, Any]
+
+State = Tuple[int, bool, List[int], bytes]
+"""
+State of a game after a move: turn, done, outcome and encoded board
+"""
+
+T = TypeVar("T")
+
+
+class RequestError(Exception):
+    """
+    Error caused by an invalid request (reported back to the client).
+    """
+
+
+class GameSession:
+    """
+    Compact state of a game hosted by the server.
+    """
+
+    __slots__ = ("side", "players", "othello", "turn", "done", "outcome",
+                 "board", "moves", "busy")
+
+    side: int
+    players: int
+    othello: bool
+    turn: int
+    done: bool
+    outcome: List[int]
+    board: bytes
+    moves: array
+    busy: bool
+
+    def __init__(self, game: Reversi, othello: bool):
+        """
+        Constructor
+
+        Args:
+            game: the newly created game
+            othello: whether the game started from the Othello
+            configuration
+        """
+        self.side = game.size
+        self.players = game.num_players
+        self.othello = othello
+        self.moves = array("H")
+        self.busy = False
+        self.store(game)
+
+    def load(self) -> Reversi:
+        """
+        Returns: the game, as a Reversi object
+        """
+        return load_position(self.side, self.players, self.othello,
+                             self.turn, self.board)
+
+    def store(self, game: Reversi) -> None:
+        """
+        Stores the current state of the game.
+        """
+        self.update(game_state(game))
+
+    def update(self, state: State) -> None:
+        """
+        Stores a state of the game computed by a worker process.
+        """
+        self.turn, self.done, self.outcome, self.board = state
+
+    def grid(self) -> BoardGridType:
+        """
+        Returns: the grid of the game (as Reversi.grid), read from the
+        encoded board without loading the game
+        """
+        return [[square or None for square in self.board[k:k + self.side]]
+                for k in range(0, len(self.board), self.side)]
+
+    def describe(self) -> Response:
+        """
+        Returns: the fields describing the state of the game
+        """
+        return {"turn": self.turn, "done": self.done,
+                "outcome": self.outcome, "version": len(self.moves)}
+
+    def changes(self, before: bytes) -> List[List[int]]:
+        """
+        Returns: the squares that differ between an earlier encoded
+        board and the current one, as [row, col, player] triples
+        """
+        return [[k // self.side, k % self.side, square]
+                for k, (old, square) in enumerate(zip(before, self.board))
+                if old != square]
+
+
+def load_position(side: int, players: int, othello: bool, turn: int,
+                  board: bytes) -> Reversi:
+    """
+    Builds a game from an encoded board.
+
+    Args:
+        side: number of squares on each side of the board
+        players: number of players
+        othello: whether the game started from the Othello configuration
+        turn: player to move
+        board: the board, as returned by Reversi.encode
+    Returns: the game
+    """
+    game: Reversi = Reversi(side, players, othello)
+    game.load_encoded(turn, board)
+    return game
+
+
+def game_state(game: Reversi) -> State:
+    """
+    Returns: the state of a game, as stored by GameSession
+    """
+    return (game.turn, game.done, game.outcome if game.done else [],
+            game.encode())
+
+
+def new_game(side: int, players: int,
+             othello: bool) -> Tuple[GameSession, BoardGridType]:
+    """
+    Creates a game (runs in a worker process).
+
+    Raises:
+        ValueError: if the options are invalid
+    Returns: the game, and its grid
+    """
+    game: Reversi = Reversi(side, players, othello)
+    return GameSession(game, othello), game.grid
+
+
+def legal_moves(side: int, players: int, othello: bool, turn: int,
+                board: bytes) -> List[Tuple[int, int]]:
+    """
+    Lists the legal moves of a position (runs in a worker process).
+    """
+    return load_position(side, players, othello, turn, board).available_moves
+
+
+def play_move(side: int, players: int, othello: bool, turn: int,
+              board: bytes, pos: Tuple[int, int]) -> Optional[State]:
+    """
+    Plays a move (runs in a worker process).
+
+    Returns: the state after the move, or None if the move is illegal
+    """
+    game: Reversi = load_position(side, players, othello, turn, board)
+    if not game.legal_move(pos):
+        return None
+    game.apply_move(pos)
+    return game_state(game)
+
+
+def bot_move(side: int, players: int, othello: bool, turn: int,
+             board: bytes, strategy: str) -> Tuple[Tuple[int, int], State]:
+    """
+    Chooses and plays a bot move (runs in a worker process).
+
+    Returns: the move, and the state after it
+    """
+    game: Reversi = load_position(side, players, othello, turn, board)
+    pos: Tuple[int, int] = ReversiBot(game).hint(strategy)
+    game.apply_move(pos)
+    return pos, game_state(game)
+
+
+def replay_board(side: int, players: int, othello: bool,
+                 moves: List[int]) -> bytes:
+    """
+    Replays the first moves of a game (runs in a worker process).
+
+    Returns: the encoded board after the moves
+    """
+    start: Reversi = Reversi(side, players, othello)
+    return start.simulate_moves([divmod(k, side) for k in moves]).encode()
+
+
+class GameServer:
+    """
+    Server hosting many Reversi games.
+    """
+
+    games: Dict[int, GameSession]
+    max_games: int
+    port: int
+
+    _next_id: int
+    _bot_moves: int
+    _pool: ProcessPoolExecutor
+    _pending: asyncio.Semaphore
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64,
+                 max_games: int = 100_000):
+        """
+        Constructor
+
+        Args:
+            workers: number of processes computing bot moves
+            (defaults to the number of CPUs)
+            max_pending: maximum number of engine calls (including bot
+            moves) queued or running at once; further requests wait for
+            a free slot
+            max_games: maximum number of open games
+        """
+        self.games = {}
+        self.max_games = max_games
+        self.port = 0
+        self._next_id = 1
+        self._bot_moves = 0
+        self._pool = ProcessPoolExecutor(workers)
+        self._pending = asyncio.Semaphore(max_pending)
+
+    def _session(self, request: Dict[str, Any]) -> GameSession:
+        """
+        Returns: the game a request refers to
+        """
+        game_id: Any = request.get("game")
+        if not isinstance(game_id, int):
+            raise RequestError("game must be an integer")
+        session: Optional[GameSession] = self.games.get(game_id)
+        if session is None:
+            raise RequestError("unknown game")
+        if session.busy:
+            raise RequestError("a move is in progress for this game")
+        return session
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Runs an engine call in the worker processes (waiting for a free
+        slot if too many are pending).
+
+        Returns: the result of the call
+        """
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, func, *args)
+
+    @staticmethod
+    def _play(session: GameSession, pos: Tuple[int, int],
+              state: State) -> Response:
+        """
+        Stores the state of a game after a move.
+
+        Returns: the response describing the move
+        """
+        before: bytes = session.board
+        session.moves.append(pos[0] * session.side + pos[1])
+        session.update(state)
+        return {"changes": session.changes(before), **session.describe()}
+
+    async def handle_request(self, request: Dict[str, Any]) -> Response:
+        """
+        Handles one request.
+
+        Args:
+            request: the decoded request
+        Returns: the response (without the "id" field)
+        """
+        try:
+            return {"ok": True, **await self._dispatch(request)}
+        except (RequestError, ValueError, TypeError, KeyError) as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Response:
+        """
+        Runs the command of a request.
+
+        Raises:
+            RequestError: if the request is invalid
+        Returns: the fields of the response
+        """
+        cmd: Optional[str] = request.get("cmd")
+        if cmd == "new":
+            if len(self.games) >= self.max_games:
+                raise RequestError("too many open games")
+            othello: bool = bool(request.get("othello", True))
+            side: int = int(request.get("side", 8))
+            if side > MAX_SIDE:
+                raise RequestError(f"side must be at most {MAX_SIDE}")
+            session, grid = await self._run(
+                new_game, side, int(request.get("players", 2)), othello)
+            game_id: int = self._next_id
+            self._next_id += 1
+            self.games[game_id] = session
+            return {"game": game_id, "grid": grid, **session.describe()}
+
+        if cmd == "stats":
+            return {"games": len(self.games),
+                    "bot_moves_pending": self._bot_moves}
+
+        session = self._session(request)
+        if cmd == "close":
+            del self.games[request["game"]]
+            return {}
+        if cmd == "grid":
+            if "since" in request:
+                version: int = int(request["since"])
+                if not 0 <= version <= len(session.moves):
+                    raise RequestError("invalid version")
+                before: bytes = await self._run(
+                    replay_board, session.side, session.players,
+                    session.othello, session.moves[:version].tolist())
+                return {"changes": session.changes(before),
+                        **session.describe()}
+            return {"grid": session.grid(), **session.describe()}
+        if session.done:
+            raise RequestError("the game is over")
+        if cmd == "moves":
+            moves: List[Tuple[int, int]] = await self._run(
+                legal_moves, session.side, session.players, session.othello,
+                session.turn, session.board)
+            return {"moves": moves, **session.describe()}
+        if cmd == "move":
+            row, col = request["pos"]
+            pos: Tuple[int, int] = (int(row), int(col))
+            session.busy = True
+            try:
+                state: Optional[State] = await self._run(
+                    play_move, session.side, session.players,
+                    session.othello, session.turn, session.board, pos)
+            finally:
+                session.busy = False
+            if state is None:
+                raise RequestError("illegal move")
+            return self._play(session, pos, state)
+        if cmd == "bot":
+            strategy: str = request.get("strategy", "random")
+            if strategy not in STRATEGIES:
+                raise RequestError("unknown strategy")
+            session.busy = True
+            self._bot_moves += 1
+            try:
+                pos, played = await self._run(
+                    bot_move, session.side, session.players, session.othello,
+                    session.turn, session.board, strategy)
+            finally:
+                session.busy = False
+                self._bot_moves -= 1
+            return {"pos": list(pos), **self._play(session, pos, played)}
+        raise RequestError("unknown command")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one client connection. Requests on one connection are
+        answered in order.
+        """
+        try:
+            async for line in reader:
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("requests must be JSON objects")
+                except ValueError as e:
+                    response: Response = {"ok": False, "error": str(e)}
+                else:
+                    response = await self.handle_request(request)
+                    if "id" in request:
+                        response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 7777,
+                    ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Accepts connections until cancelled.
+
+        Args:
+            host: address to listen on
+            port: port to listen on (0 picks a free port)
+            ready: set once the server is listening
+        """
+        server = await asyncio.start_server(self._handle_connection,
+                                            host, port, limit=2 ** 20)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self._pool.shutdown(cancel_futures=True)
+
+
+@click.command("server")
+@click.option('--host', default="127.0.0.1")
+@click.option('--port', type=int, default=7777)
+@click.option('-w', '--workers', type=int, default=None,
+              help="Number of processes computing bot moves")
+@click.option('--max-pending', type=int, default=64,
+              help="Maximum number of bot moves queued at once")
+@click.option('--max-games', type=int, default=100_000)
+def main(host: str, port: int, workers: Optional[int], max_pending: int,
+         max_games: int) -> None:
+    server: GameServer = GameServer(workers, max_pending, max_games)
+    print(f"Listening on {host}:{port}")
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
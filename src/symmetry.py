@@ -0,0 +1,113 @@
+"""
+Symmetries of the board
+
+A square board has 8 symmetries (rotations and reflections), and the
+rules of the game do not depend on how the board is turned, so the 8
+images of a position are equivalent. canonicalize maps a position to
+the smallest of its images (comparing the bytes of Reversi.encode),
+so caches and books can store one entry for all of them, and returns
+the transform used, so that moves can be mapped between the position
+and its canonical form.
+
+The images are computed with permutation tables (one
+operator.itemgetter per transform and board size, built once), rather
+than by rebuilding the grid.
+"""
+
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, List, Tuple
+
+TRANSFORMS: List[Callable[[int, int, int], Tuple[int, int]]] = [
+    lambda r, c, n: (r, c),
+    lambda r, c, n: (c, n - r),
+    lambda r, c, n: (n - r, n - c),
+    lambda r, c, n: (n - c, r),
+    lambda r, c, n: (r, n - c),
+    lambda r, c, n: (n - r, c),
+    lambda r, c, n: (c, r),
+    lambda r, c, n: (n - c, n - r),
+]
+"""
+Where each transform moves the square (r, c) of a board whose last
+row and column are n: the identity, the rotations by 90, 180 and 270
+degrees, and the reflections across the vertical axis, the horizontal
+axis, the main diagonal and the anti-diagonal
+"""
+
+
+@lru_cache(maxsize=None)
+def tables(side: int) -> Tuple[List[Callable[[bytes], Tuple[int, ...]]],
+                               List[Tuple[int, ...]], List[Tuple[int, ...]]]:
+    """
+    Builds the permutation tables of a board size (once per size).
+
+    Args:
+        side: number of squares on each side of the board
+    Returns: for each transform, a function returning the squares of
+    the transformed board (as a tuple), the destination of each square
+    and the source of each square
+    """
+    getters: List[Callable[[bytes], Tuple[int, ...]]] = []
+    destinations: List[Tuple[int, ...]] = []
+    sources: List[Tuple[int, ...]] = []
+    for transform in TRANSFORMS:
+        destination: List[int] = [0] * (side * side)
+        source: List[int] = [0] * (side * side)
+        for k in range(side * side):
+            row, col = transform(k // side, k % side, side - 1)
+            destination[k] = row * side + col
+            source[row * side + col] = k
+        getters.append(itemgetter(*source))
+        destinations.append(tuple(destination))
+        sources.append(tuple(source))
+    return getters, destinations, sources
+
+
+def transform_board(board: bytes, side: int, transform: int) -> bytes:
+    """
+    Returns: the image of a board (one byte per square, as returned
+    by Reversi.encode) by a transform
+    """
+    getters, _, _ = tables(side)
+    return bytes(getters[transform](board))
+
+
+def canonicalize(board: bytes, side: int) -> Tuple[bytes, int]:
+    """
+    Maps a board to its canonical form: the smallest of its 8 images.
+
+    Args:
+        board: the board, one byte per square (see Reversi.encode)
+        side: number of squares on each side of the board
+    Returns: the canonical board, and the transform that maps the
+    board to it (see to_canonical and from_canonical for moves)
+    """
+    getters, _, _ = tables(side)
+    best: bytes = board
+    best_transform: int = 0
+    for transform in range(1, len(getters)):
+        image: bytes = bytes(getters[transform](board))
+        if image < best:
+            best = image
+            best_transform = transform
+    return best, best_transform
+
+
+def to_canonical(move: Tuple[int, int], side: int,
+                 transform: int) -> Tuple[int, int]:
+    """
+    Returns: the square a move is mapped to in the canonical board
+    """
+    _, destinations, _ = tables(side)
+    return divmod(destinations[transform][move[0] * side + move[1]], side)
+
+
+def from_canonical(move: Tuple[int, int], side: int,
+                   transform: int) -> Tuple[int, int]:
+    """
+    Returns: the square of the original board that a move in the
+    canonical board corresponds to
+    """
+    _, _, sources = tables(side)
+    return divmod(sources[transform][move[0] * side + move[1]], side)
@@ -1,10 +1,207 @@
 from typing import List, Tuple, Optional
 import click
+import shutil
 import sys
-from reversi import Reversi, Board, BoardGridType, COLORS
-from bot import ReversiBot
+import threading
+import time
+from reversi import Reversi, Board, BoardGridType, COLORS, Piece, \
+    board_template
+from bot import ReversiBot, VerySmartBot
+from profiling import profile, profile_option
 from termcolor import colored, cprint
 
+
+class Renderer:
+    """
+    Draws the board in the terminal.
+
+    With ANSI output, the board is drawn in full once, at the top of the
+    screen, and the text below the board (prompts and messages) is
+    printed in a scroll region, so however much of it is printed, the
+    board never scrolls. After that, only the squares that changed are
+    redrawn, by moving the cursor to them, and the text below the board
+    is cleared before each turn. Otherwise, the whole board is printed
+    before each turn.
+    """
+
+    game: Reversi
+    ansi: bool
+    lines: int
+    messages: List[str]
+    _shown: Optional[bytes]
+
+    def __init__(self, game: Reversi, ansi: bool,
+                 lines: Optional[int] = None):
+        """
+        Constructor
+
+        Args:
+            game: the game to draw
+            ansi: whether to use ANSI escape codes to redraw the board
+            lines: height of the terminal (default: the current one)
+        """
+        self.game = game
+        self.ansi = ansi
+        self.lines = lines or shutil.get_terminal_size().lines
+        self.messages = []
+        self._shown = None
+
+    def say(self, message: str) -> None:
+        """
+        Prints a message that stays below the board until the next turn.
+        """
+        print(message)
+        self.messages.append(message)
+
+    def draw(self) -> None:
+        """
+        Draws the current state of the board.
+        """
+        if not self.ansi:
+            print(self.game)
+            self.messages = []
+            return
+
+        board: bytes = self.game.encode()
+        side: int = self.game.size
+        out: List[str] = []
+        if self._shown is None:
+            #clear the screen, draw the empty board at the top and
+            # make the lines below it a scroll region
+            out.append("\x1b[2J\x1b[H")
+            out.append("\n".join(board_template(side)))
+            out.append(f"\x1b[{2 * side + 2};{self.lines}r")
+            self._shown = bytes(len(board))
+        for k, (old, new) in enumerate(zip(self._shown, board)):
+            if old != new:
+                i, j = divmod(k, side)
+                #squares are at line 2i + 1, column 2j + 1 (counted from 0)
+                out.append(f"\x1b[{2 * i + 2};{2 * j + 2}H" +
+                           (str(Piece(new)) if new else " "))
+        #move below the board and clear the previous turn's text
+        out.append(f"\x1b[{2 * side + 2};1H\x1b[J")
+        sys.stdout.write("".join(out))
+        self._shown = board
+        for message in self.messages:
+            print(message)
+        self.messages = []
+
+    def close(self) -> None:
+        """
+        Gives the whole terminal back to scrolling output (keeping the
+        cursor where it is).
+        """
+        if self.ansi and self._shown is not None:
+            sys.stdout.write("\x1b7\x1b[r\x1b8")
+            sys.stdout.flush()
+            self._shown = None
+
+
+class HintSearch:
+    """
+    Background search for a hint, started when a human's turn begins.
+
+    The search runs in a thread on a copy of the game and keeps the best
+    move it has found so far, so a hint can be given without waiting
+    for the search to finish.
+    """
+
+    best: Optional[Tuple[int, int]]
+
+    _found: threading.Event
+    _stop: threading.Event
+    _thread: threading.Thread
+
+    def __init__(self, game: Reversi):
+        """
+        Constructor (starts the search)
+
+        Args:
+            game: the game, at the start of a human's turn
+        """
+        self.best = None
+        self._found = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(game.simulate_moves([]),), daemon=True)
+        self._thread.start()
+
+    def _run(self, snapshot: Reversi) -> None:
+        """
+        Runs the search (in the background thread).
+        """
+        for move in VerySmartBot(snapshot).search():
+            if self._stop.is_set():
+                return
+            self.best = move
+            self._found.set()
+
+    def hint(self) -> Tuple[int, int]:
+        """
+        Returns: the best move found so far (waits only if the search
+        has not evaluated any move yet)
+        """
+        self._found.wait()
+        assert self.best is not None
+        return self.best
+
+    def cancel(self) -> None:
+        """
+        Stops the search. Its result is discarded.
+        """
+        self._stop.set()
+
+
+def spectate_game(game: Reversi, strategies: List[str], renderer: Renderer,
+                  delay: float = 0.0, every: Optional[int] = 1,
+                  headless: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    Plays a game where every seat is a bot, for watching.
+
+    Args:
+        game: the game to play
+        strategies: bot strategy of each player (cycled if there are
+        fewer strategies than players)
+        renderer: draws the board
+        delay: seconds to wait after drawing a position
+        every: draw every Nth position (0 draws only the final board)
+        headless: print only the move list, without drawing the board
+    Returns: the moves played, as (player, row, col) triples
+    """
+    game_bot: ReversiBot = ReversiBot(game)
+    moves: List[Tuple[int, int, int]] = []
+    while not game.done:
+        player: int = game.turn
+        strategy: str = strategies[(player - 1) % len(strategies)]
+        i, j = game_bot.hint(strategy)
+        game_bot.move(strategy)
+        moves.append((player, i, j))
+        col_turn: str = colored(str(player), COLORS[player])
+        line: str = f"{len(moves)}. Player {col_turn} ({strategy}): {i}, {j}"
+        if headless:
+            print(line)
+        elif every and len(moves) % every == 0 and not game.done:
+            renderer.say(line)
+            renderer.draw()
+            if delay > 0:
+                time.sleep(delay)
+    if not headless:
+        renderer.draw()
+    return moves
+
+
+def use_ansi(game: Reversi, plain: bool) -> bool:
+    """
+    Returns: whether the board can be redrawn in place (the output is a
+    terminal that is tall enough to fit the board and a few lines of
+    text below it)
+    """
+    if plain or not sys.stdout.isatty():
+        return False
+    lines: int = shutil.get_terminal_size().lines
+    return 2 * game.size + 1 + 4 <= lines
+
+
 @click.command("tui")
 @click.option("-n", "--num-players", default = 2)
 @click.option("-s", "--board-size", default = 8)
@@ -13,18 +210,75 @@ from termcolor import colored, cprint
 @click.option("--bot",
               type = click.Choice(["random", "smart", "very-smart"]),
               default = None)
+@click.option("--plain", is_flag = True,
+              help = "Reprint the whole board every turn")
+@click.option("--spectate", multiple = True,
+              type = click.Choice(["random", "smart", "very-smart"]),
+              help = "Watch bots play: the strategy of each player " +
+              "(repeat the option once per player, or give it once " +
+              "for all players)")
+@click.option("--delay", type = float, default = None,
+              help = "Seconds between positions when spectating " +
+              "(default: 0.5, or 0 with --fast-forward)")
+@click.option("--fast-forward", type = int, default = None,
+              help = "When spectating, draw only every Nth position " +
+              "(0: only the final board), without waiting between " +
+              "them")
+@click.option("--headless", is_flag = True,
+              help = "When spectating, print only the move list")
+@profile_option
 def run_game(num_players: int, board_size: int, othello: bool, 
-             non_othello: bool, bot: Optional[str]) -> None:
+             non_othello: bool, bot: Optional[str], plain: bool,
+             spectate: Tuple[str, ...], delay: Optional[float],
+             fast_forward: Optional[int], headless: bool,
+             profile_path: Optional[str]) -> None:
+    if delay is not None and fast_forward is not None:
+        raise click.BadParameter("--delay cannot be used with --fast-forward")
+    if delay is None:
+        delay = 0.5 if fast_forward is None else 0.0
+    with profile(profile_path):
+        play(num_players, board_size, non_othello, bot, plain, spectate,
+             delay, fast_forward, headless)
+
+
+def play(num_players: int, board_size: int, non_othello: bool,
+         bot: Optional[str], plain: bool, spectate: Tuple[str, ...],
+         delay: float, fast_forward: Optional[int], headless: bool) -> None:
+    """
+    Runs a game in the terminal (see run_game for the options).
+    """
     try:
         game: Reversi = Reversi(board_size, num_players, not non_othello)
     except Exception as e:
         print(e)
         sys.exit()
+    renderer: Renderer = Renderer(game, use_ansi(game, plain))
+    try:
+        play_turns(game, renderer, bot, spectate, delay, fast_forward,
+                   headless)
+    finally:
+        renderer.close()
+
+
+def play_turns(game: Reversi, renderer: Renderer, bot: Optional[str],
+               spectate: Tuple[str, ...], delay: float,
+               fast_forward: Optional[int], headless: bool) -> None:
+    """
+    Plays a game until it is over (see run_game for the options).
+    """
+    if spectate:
+        if not headless:
+            renderer.draw()
+        spectate_game(game, list(spectate), renderer, delay,
+                      1 if fast_forward is None else fast_forward, headless)
+        print_outcome(game)
+        return
     game_bot: ReversiBot = ReversiBot(game)
 
     while not game.done:
         if (bot is None) or game.turn == 1:
-            print(game)
+            renderer.draw()
+            search: HintSearch = HintSearch(game)
             proceed: bool = False
             while not proceed:
                 col_turn: str = colored(str(game.turn), COLORS[game.turn])
@@ -36,7 +290,7 @@ def run_game(num_players: int, board_size: int, othello: bool,
                 print()
                 inp: str = input(">")
                 if inp == "hint":
-                    i, j = game_bot.hint("very-smart")
+                    i, j = search.hint()
                     print(f"Try {i}, {j}.")
                     print()
                     continue
@@ -49,15 +303,24 @@ def run_game(num_players: int, board_size: int, othello: bool,
                         continue
                 except:
                     continue
+            search.cancel()
             game.apply_move(move)
         if (not bot is None) and game.turn != 1:
-            print(game)
+            renderer.draw()
             i, j = game_bot.hint(bot)
             col_turn = colored(str(game.turn), COLORS[game.turn])
-            print(f"Player {col_turn} ({bot} bot) makes the move {i}, {j}.")
+            renderer.say(f"Player {col_turn} ({bot} bot) makes the move " +
+                         f"{i}, {j}.")
             game_bot.move(bot)
             
-    print(game)
+    renderer.draw()
+    print_outcome(game)
+
+
+def print_outcome(game: Reversi) -> None:
+    """
+    Prints the winners of a finished game.
+    """
     winners: List[str] = [colored(str(x), COLORS[x]) for x in game.outcome]
     winners_str: str = ", ".join(winners)
     print("The game is done.")
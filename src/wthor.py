@@ -0,0 +1,232 @@
+"""
+Importer for WTHOR game databases
+(and command for running it)
+
+WTHOR (.wtb) files start with a 16-byte header:
+
+    bytes 0-3    date the file was created (century, year, month, day)
+    bytes 4-7    number of games (uint32, little-endian)
+    bytes 8-9    number of records of other kinds (uint16, unused here)
+    bytes 10-11  year of the games (uint16)
+    byte 12      board size (0 or 8 for 8x8)
+    byte 13      game type
+    byte 14      depth of the theoretical score
+    byte 15      reserved
+
+followed by one 68-byte record per game:
+
+    bytes 0-1    tournament number (uint16)
+    bytes 2-3    black player number (uint16)
+    bytes 4-5    white player number (uint16)
+    byte 6       number of black pieces at the end of the game
+    byte 7       theoretical score
+    bytes 8-67   moves, each as 10 * row + column (from 11 for a1 to 88
+                 for h8), padded with zeros
+
+Black moves first from the standard Othello position, so black is
+player 1 of Reversi(8, 2, True), and passes are not recorded (as in
+our game records). Every game is replayed with the engine, and games
+with an illegal move are rejected. Files are split into chunks of
+games, which are replayed in parallel by worker processes.
+"""
+
+import os
+import struct
+import time
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple, Union
+
+import click
+
+from reversi import Reversi
+from records import GAMES_MAGIC, POSITIONS_MAGIC, GameRecord, Position, \
+    pack_game, pack_position
+
+HEADER = struct.Struct("<4sIHHBBBB")
+GAME = struct.Struct("<HHHBB60s")
+
+SIDE: int = 8
+
+_TO_INDEX: bytes = bytes(
+    (v // 10 - 1) * SIDE + v % 10 - 1 if 1 <= v // 10 <= SIDE and
+    1 <= v % 10 <= SIDE else 255 for v in range(256))
+"""
+Translation table from WTHOR move codes to square indices
+(row * side + col), with 255 for codes that are not squares
+"""
+
+ImportResult = Tuple[List[GameRecord], List[Position], int]
+
+
+def num_games(data: bytes) -> int:
+    """
+    Reads the header of a WTHOR file.
+
+    Args:
+        data: contents of the file (or at least of its header)
+    Raises:
+        ValueError: if the file is not for 8x8 boards
+    Returns: the number of games in the file
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated WTHOR header.")
+    _, games, _, _, board_size, _, _, _ = HEADER.unpack_from(data)
+    if board_size not in (0, SIDE):
+        raise ValueError(f"Unsupported board size {board_size}.")
+    return games
+
+
+def parse(data: bytes, first: int = 0,
+          count: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Parses the games of a WTHOR file.
+
+    Args:
+        data: contents of the file
+        first: number of games to skip
+        count: maximum number of games to parse (default: all of them)
+    Raises:
+        ValueError: if the file is truncated or is not for 8x8 boards
+    Returns: an iterator over the moves of each game, as square
+    indices (row * side + col), one byte per move (255 for a byte
+    that is not a square)
+    """
+    games: int = num_games(data)
+    if len(data) < HEADER.size + games * GAME.size:
+        raise ValueError("Truncated WTHOR file.")
+    last: int = games if count is None else min(games, first + count)
+    return parse_records(memoryview(data)[HEADER.size + first * GAME.size:
+                                          HEADER.size + last * GAME.size])
+
+
+def parse_records(records: Union[bytes, memoryview]) -> Iterator[bytes]:
+    """
+    Parses game records (without the header of the file).
+
+    Args:
+        records: whole 68-byte game records
+    Returns: an iterator over the moves of each game (see parse)
+    """
+    for *_, moves in GAME.iter_unpack(records):
+        yield moves.rstrip(b"\0").translate(_TO_INDEX)
+
+
+def replay(moves: bytes,
+           positions: Optional[List[Position]] = None) -> bool:
+    """
+    Replays a game with the engine.
+
+    Args:
+        moves: square index of each move
+        positions: if given, the position before each move is
+        appended to it
+    Returns: whether every move was legal
+    """
+    game: Reversi = Reversi(SIDE, 2, True)
+    for index in moves:
+        row, col = divmod(index, SIDE)
+        if game.done or index >= SIDE * SIDE or not game.legal_move((row,
+                                                                     col)):
+            return False
+        if positions is not None:
+            positions.append((SIDE, 2, game.turn, game.encode()))
+        game.apply_move((row, col))
+    return True
+
+
+def import_file(path: str, with_positions: bool = False, first: int = 0,
+                count: Optional[int] = None) -> ImportResult:
+    """
+    Imports the games of a WTHOR file (runs in a worker process).
+    Only the header and the records of the games imported are read.
+
+    Args:
+        path: the file
+        with_positions: whether to also return every position
+        first, count: range of games to import (see parse)
+    Raises:
+        ValueError: if the file is not a valid WTHOR file
+    Returns: the game records of the legal games, the positions (if
+    requested) and the number of rejected games
+    """
+    with open(path, "rb") as f:
+        total: int = num_games(f.read(HEADER.size))
+        last: int = total if count is None else min(total, first + count)
+        f.seek(HEADER.size + first * GAME.size)
+        data: bytes = f.read(max(0, last - first) * GAME.size)
+    if len(data) != max(0, last - first) * GAME.size:
+        raise ValueError("Truncated WTHOR file.")
+    games: List[GameRecord] = []
+    positions: List[Position] = []
+    rejected: int = 0
+    for moves in parse_records(data):
+        game_positions: Optional[List[Position]] = [] if with_positions \
+            else None
+        if replay(moves, game_positions):
+            games.append((SIDE, 2, True, list(moves)))
+            if game_positions is not None:
+                positions += game_positions
+        else:
+            rejected += 1
+    return games, positions, rejected
+
+
+ImportTask = Tuple[str, bool, int, int]
+
+
+def _import_task(task: ImportTask) -> ImportResult:
+    """
+    Runs import_file with the arguments of a pool task.
+    """
+    return import_file(*task)
+
+
+@click.command("wthor")
+@click.argument("files", nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", type=click.Path(dir_okay=False),
+              required=True, help="File of game records to write")
+@click.option("--positions", type=click.Path(dir_okay=False), default=None,
+              help="Also write every position to this file")
+@click.option("-j", "--jobs", type=int, default=None,
+              help="Number of worker processes (default: number of CPUs)")
+@click.option("--chunk-size", type=int, default=2000,
+              help="Number of games replayed by a worker at a time")
+def main(files: Tuple[str, ...], output: str, positions: Optional[str],
+         jobs: Optional[int], chunk_size: int) -> None:
+    start: float = time.perf_counter()
+    games: int = 0
+    rejected: int = 0
+    num_positions: int = 0
+    tasks: List[ImportTask] = []
+    for path in files:
+        with open(path, "rb") as f:
+            try:
+                total: int = num_games(f.read(HEADER.size))
+            except ValueError as e:
+                raise click.BadParameter(f"{path}: {e}") from e
+        tasks += [(path, positions is not None, first, chunk_size)
+                  for first in range(0, total, chunk_size)]
+    with Pool(jobs) as pool, open(output, "wb") as games_file, \
+            open(positions or os.devnull, "wb") as positions_file:
+        games_file.write(GAMES_MAGIC)
+        positions_file.write(POSITIONS_MAGIC)
+        for records, file_positions, file_rejected in \
+                pool.imap(_import_task, tasks):
+            games_file.write(b"".join(pack_game(*record)
+                                      for record in records))
+            positions_file.write(b"".join(pack_position(*position)
+                                          for position in file_positions))
+            games += len(records)
+            num_positions += len(file_positions)
+            rejected += file_rejected
+    elapsed: float = time.perf_counter() - start
+    print(f"Imported {games} games from {len(files)} files " +
+          f"({rejected} rejected) in {elapsed:.1f}s " +
+          f"({games / elapsed if elapsed else 0.0:.0f} games/s)")
+    if positions is not None:
+        print(f"Wrote {num_positions} positions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared fixtures
+
+The perf_budget fixture checks a scenario against a time budget and a
+tracemalloc peak memory budget. Time budgets are given in calibration
+units: the time this machine takes to run a fixed pure-Python loop
+(see calibrate), so the same budget holds on fast and slow machines.
+"""
+
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import pytest
+
+
+def calibrate(repeat: int = 5) -> float:
+    """
+    Times the calibration loop (best of several runs, to ignore noise).
+
+    Returns: the length of one calibration unit, in seconds
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        grid = [[None] * 8 for _ in range(8)]
+        empty: int = 0
+        for k in range(20_000):
+            for i in range(8):
+                if grid[i][k % 8] is None:
+                    empty += 1
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(scope="session")
+def calibration_unit() -> float:
+    """
+    Returns: the length of one calibration unit on this machine,
+    in seconds
+    """
+    return calibrate()
+
+
+@pytest.fixture
+def perf_budget(calibration_unit: float) -> Callable[..., None]:
+    """
+    Returns a function that runs a scenario and fails the test if it
+    is over budget.
+
+    The function takes the scenario (a function without arguments),
+    its time budget in calibration units, its peak memory budget in
+    bytes, and the number of timed runs (the fastest one counts).
+    """
+    def check(scenario: Callable[[], Any], units: float, peak_bytes: int,
+              rounds: int = 3) -> None:
+        best: float = float("inf")
+        for _ in range(rounds):
+            start: float = time.perf_counter()
+            scenario()
+            best = min(best, time.perf_counter() - start)
+        used: float = best / calibration_unit
+        assert used <= units, \
+            f"took {used:.1f} calibration units (budget: {units})"
+
+        tracemalloc.start()
+        try:
+            scenario()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak <= peak_bytes, \
+            f"peak memory {peak} bytes (budget: {peak_bytes})"
+    return check
@@ -0,0 +1,46 @@
+"""
+Tests for the micro-benchmark suite
+"""
+
+from bench import CONFIGS, build_corpus, compare_results, run_benchmarks
+
+
+def test_corpus_is_fixed():
+    """
+    Test that the corpus covers every configuration and is the same
+    for the same seed
+    """
+    corpus = build_corpus(0)
+    assert {config for config, _ in corpus} == set(CONFIGS)
+    assert all(not game.done for _, game in corpus)
+    assert [game.grid for _, game in corpus] == \
+        [game.grid for _, game in build_corpus(0)]
+
+
+def test_run_benchmarks_reports_every_metric():
+    """
+    Test that a run reports time, allocations and peak memory
+    """
+    results = run_benchmarks(["legal_move", "grid"], min_time=0.0)
+    assert list(results["results"]) == ["legal_move", "grid"]
+    for row in results["results"].values():
+        assert row["ns_per_op"] > 0
+        assert row["calls"] == len(results["corpus"])
+        assert row["allocations"] >= 0
+        assert row["peak_bytes"] >= 0
+    assert results["results"]["grid"]["allocations"] > 0
+
+
+def test_compare_flags_regressions():
+    """
+    Test that only increases above the threshold are flagged
+    """
+    old = {"results": {"grid": {"ns_per_op": 100.0, "allocations": 10.0,
+                                "peak_bytes": 1000.0},
+                       "gone": {"ns_per_op": 1.0, "allocations": 0.0,
+                                "peak_bytes": 0.0}}}
+    new = {"results": {"grid": {"ns_per_op": 120.0, "allocations": 10.5,
+                                "peak_bytes": 500.0}}}
+    rows = compare_results(old, new, threshold=0.1)
+    assert [(metric, regressed) for _, metric, _, _, regressed in rows] == \
+        [("ns_per_op", True), ("allocations", False), ("peak_bytes", False)]
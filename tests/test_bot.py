@@ -0,0 +1,67 @@
+"""
+Tests for the bots and the simulation command
+"""
+
+from reversi import Reversi
+from bot import ReversiBot, SimulationStats, VerySmartBot, percentile, \
+    play_game
+
+
+def test_percentile():
+    """
+    Test nearest-rank percentiles
+    """
+    values = [float(x) for x in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 50) == 3.0
+
+
+def test_play_game_records_every_move():
+    """
+    Test that play_game records one think time per move and the
+    length of the game
+    """
+    stats = SimulationStats()
+    game = Reversi(8, 2, True)
+    play_game("random", "smart", game, stats)
+    length = stats.game_lengths[0]
+    assert len(stats.move_times) == length
+    assert [ply for _, ply, _, _ in stats.move_times] == list(range(length))
+    assert set(stats.times_by_strategy()) == {"random", "smart"}
+    #every move adds one piece to the board
+    pieces = sum(square is not None for row in game.grid for square in row)
+    assert pieces == 4 + length
+
+
+def test_very_smart_search_yields_legal_moves():
+    """
+    Test that the anytime search yields one legal move per candidate,
+    plus the final choice
+    """
+    game = Reversi(8, 2, True)
+    game.apply_move((2, 3))
+    moves = list(VerySmartBot(game).search())
+    assert len(moves) == len(game.available_moves) + 1
+    assert all(move in game.available_moves for move in moves)
+
+
+def test_move_plays_the_hinted_move():
+    """
+    Test that move plays the move returned by the last hint, and that
+    the decision is recomputed once the board changes
+    """
+    game = Reversi(8, 2, True)
+    game_bot = ReversiBot(game)
+    for _ in range(10):
+        move = game_bot.hint("random")
+        assert all(game_bot.hint("random") == move for _ in range(5))
+        expected = game.simulate_moves([move]).grid
+        game_bot.move("random")
+        assert game.grid == expected
+
+    #a move applied directly to the game also invalidates the decision
+    move = game_bot.hint("smart")
+    game.apply_move(move)
+    assert game_bot.hint("smart") in game.available_moves
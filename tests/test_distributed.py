@@ -0,0 +1,78 @@
+"""
+Tests for the distributed simulation coordinator and workers
+"""
+
+import asyncio
+import json
+import multiprocessing
+import socket
+import threading
+
+from distributed import Coordinator, play_seeded_game, run_worker
+
+
+def start_coordinator(coordinator):
+    """
+    Runs a coordinator in a background thread, and returns the
+    thread and the port the coordinator listens on
+    """
+    ready = threading.Event()
+    port = []
+
+    def on_ready(p):
+        port.append(p)
+        ready.set()
+
+    thread = threading.Thread(
+        target=lambda: asyncio.run(coordinator.serve(on_ready=on_ready)),
+        daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    return thread, port[0]
+
+
+def test_workers_match_serial_results():
+    """
+    Test that games played by several worker processes give the same
+    results as playing the same seeds serially
+    """
+    pairs = [("random", "smart"), ("smart", "random")]
+    coordinator = Coordinator(pairs, num_games=6, chunk_size=2)
+    thread, port = start_coordinator(coordinator)
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=("127.0.0.1", port))
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    thread.join(60)
+    for worker in workers:
+        worker.join(10)
+        assert worker.exitcode == 0
+    assert coordinator.finished
+    for (player1, player2), results in zip(pairs, coordinator.results):
+        assert sorted(results) == list(range(6))
+        for seed, winners in results.items():
+            assert winners == play_seeded_game(player1, player2, seed)
+
+
+def test_lost_range_is_redispatched():
+    """
+    Test that the seeds of a worker that stops sending heartbeats
+    are handed to another worker
+    """
+    coordinator = Coordinator([("random", "random")], num_games=4,
+                              chunk_size=4, heartbeat_timeout=0.5)
+    thread, port = start_coordinator(coordinator)
+
+    #a worker that reports one game and then goes silent
+    with socket.create_connection(("127.0.0.1", port)) as silent:
+        silent.sendall(b'{"type": "hello", "worker": "silent"}\n')
+        task = json.loads(silent.makefile("rb").readline())
+        assert (task["seed"], task["count"]) == (0, 4)
+        winners = play_seeded_game("random", "random", 0)
+        silent.sendall(json.dumps({"type": "result", "task": task["task"],
+                                   "seed": 0, "winners": winners})
+                       .encode() + b"\n")
+        assert run_worker("127.0.0.1", port) == 3
+    thread.join(10)
+    assert sorted(coordinator.results[0]) == [0, 1, 2, 3]
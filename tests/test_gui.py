@@ -0,0 +1,71 @@
+"""
+Tests for the graphical interface (with SDL's dummy video driver, so
+no window is opened)
+"""
+
+import os
+
+import pytest
+
+from reversi import Reversi
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+import gui  # pylint: disable=wrong-import-position
+from gui import Game_Interface  # pylint: disable=wrong-import-position
+
+
+@pytest.mark.parametrize("side", [4, 8, 20, 100])
+def test_zoom_in_never_shrinks_cells(side, monkeypatch):
+    """
+    Test that zooming in never makes the cells smaller, even on boards
+    small enough that the whole board is shown with large cells
+    """
+    #the constructor would otherwise run the event loop
+    monkeypatch.setattr(Game_Interface, "event_loop", lambda self: None)
+    players = 2 if side % 2 == 0 else 3
+    interface = Game_Interface(Reversi(side, players, side % 2 == 0))
+    try:
+        center = (interface.window // 2, interface.window // 2)
+        interface.zoom(0, center)
+        for _ in range(30):
+            before = interface.square
+            interface.zoom(interface.zoom_step, center)
+            assert interface.square >= before
+        assert interface.square == interface.max_square
+    finally:
+        pygame.quit()
+
+
+def test_failing_bot_does_not_hang_the_game(monkeypatch, capsys):
+    """
+    Test that when the bot raises, its worker still posts a BOT_MOVE
+    event, which stops the thinking indicator and hands the bot's
+    moves to the human
+    """
+    monkeypatch.setattr(Game_Interface, "event_loop", lambda self: None)
+
+    class BrokenBot:
+        def __init__(self, game):
+            pass
+
+        def hint(self, bot):
+            raise ValueError("no move")
+
+    interface = Game_Interface(Reversi(8, 2, True), bot="random")
+    try:
+        monkeypatch.setattr(gui, "ReversiBot", BrokenBot)
+        interface.game.apply_move((2, 3))
+        interface.moves_played += 1
+        interface.thinking = True
+        Game_Interface.bot_worker(interface.game.simulate_moves([]),
+                                  "random", interface.moves_played)
+        events = pygame.event.get(gui.BOT_MOVE)
+        assert len(events) == 1 and events[0].move is None
+        interface.handle_event(events[0])
+        assert not interface.thinking
+        assert interface.bot is None
+        assert "no move" in capsys.readouterr().err
+    finally:
+        pygame.quit()
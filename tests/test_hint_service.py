@@ -0,0 +1,123 @@
+"""
+Tests for the batched hint service
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from reversi import Reversi
+from hint_service import compute_hints
+from symmetry import to_canonical, transform_board
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+@pytest.fixture
+def service(request):
+    """
+    Runs the hint service in a separate process (with the extra
+    options given as the parameter, if any), and yields a connection
+    to it
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SRC, "hint_service.py"), "--port", "0",
+         "--workers", "1", *getattr(request, "param", [])],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        port = int(line.rsplit(":", 1)[1])
+        with socket.create_connection(("127.0.0.1", port)) as conn:
+            yield conn
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def exchange(conn, requests):
+    """
+    Sends all requests at once, then reads one response per request
+    """
+    conn.sendall(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+    lines = conn.makefile("rb")
+    return [json.loads(lines.readline()) for _ in requests]
+
+
+def test_identical_positions_are_computed_once(service):
+    """
+    Test that concurrent requests for one position are coalesced, and
+    that later requests are answered from the cache
+    """
+    game = Reversi(8, 2, True)
+    request = {"cmd": "hint", "grid": game.grid, "turn": 1, "players": 2}
+    responses = exchange(service, [dict(request, id=i) for i in range(20)])
+    assert all(r["ok"] for r in responses)
+    assert sorted(r["id"] for r in responses) == list(range(20))
+    assert len({tuple(r["pos"]) for r in responses}) == 1
+    assert tuple(responses[0]["pos"]) in game.available_moves
+
+    cached, stats = exchange(service, [request, {"cmd": "stats"}])
+    assert cached["cached"] and cached["pos"] == responses[0]["pos"]
+    assert stats["misses"] == 1
+    assert stats["hits"] + stats["coalesced"] == 20
+    assert stats["cache_size"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_invalid_position(service):
+    """
+    Test that invalid positions get error responses
+    """
+    grid = [[None, 5], [None, None]]
+    response, = exchange(service, [{"cmd": "hint", "grid": grid,
+                                    "turn": 1, "players": 2}])
+    assert not response["ok"]
+
+
+@pytest.mark.parametrize("service", [["--canonical"]], indirect=True)
+def test_symmetric_positions_share_hints(service):
+    """
+    Test that with --canonical, the rotations and reflections of a
+    position are answered from one cache entry, with the move mapped
+    to each of them
+    """
+    game = Reversi(8, 2, True)
+    game.apply_move((2, 3))
+    game.apply_move((2, 2))
+    board = game.encode()
+    first, = exchange(service, [{"cmd": "hint", "grid": game.grid,
+                                 "turn": game.turn, "players": 2}])
+    assert first["ok"] and tuple(first["pos"]) in game.available_moves
+    for transform in range(1, 8):
+        image = Reversi(8, 2, False)
+        image.load_encoded(game.turn, transform_board(board, 8, transform))
+        response, = exchange(service, [{"cmd": "hint", "grid": image.grid,
+                                        "turn": game.turn, "players": 2}])
+        assert response["cached"]
+        assert tuple(response["pos"]) == \
+            to_canonical(tuple(first["pos"]), 8, transform)
+    stats, = exchange(service, [{"cmd": "stats"}])
+    assert stats["misses"] == 1 and stats["cache_size"] == 1
+
+
+def test_failing_jobs_do_not_affect_the_batch():
+    """
+    Test that a position where the player to move has to pass gets an
+    empty hint, and that a job that fails only gets an error for
+    itself
+    """
+    game = Reversi(8, 2, True)
+    good = (8, 2, 1, game.encode(), "very-smart")
+    must_pass = (4, 2, 1, bytes([0, 2, 2, 2, 1, 2, 1, 1,
+                                 2, 2, 2, 1, 2, 2, 1, 0]), "very-smart")
+    bad = (8, 2, 1, game.encode(), "clairvoyant")
+    first, passed, failed, again = compute_hints([good, must_pass, bad,
+                                                  good])
+    assert tuple(first) in game.available_moves
+    assert tuple(again) in game.available_moves
+    assert passed == []
+    assert isinstance(failed, str)
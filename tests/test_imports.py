@@ -0,0 +1,33 @@
+"""
+Tests for the import graph of the entry points (cold start)
+"""
+
+import pytest
+
+from bench import import_profile, run_imports
+
+
+@pytest.mark.parametrize("module, forbidden", [
+    ("reversi", ["copy", "hashlib", "termcolor", "click", "pygame",
+                 "mocks"]),
+    ("bot", ["mocks", "pygame", "termcolor", "cProfile"]),
+    ("gui", ["pygame", "mocks"]),
+    ("tui", ["pygame", "mocks"]),
+])
+def test_entry_point_imports(module, forbidden):
+    """
+    Test that importing an entry point does not load modules it only
+    needs later (or never)
+    """
+    loaded = import_profile(module)
+    assert module in loaded
+    assert not [name for name in forbidden if name in loaded]
+
+
+def test_run_imports_reports_time():
+    """
+    Test the import benchmark results
+    """
+    results = run_imports(["reversi"], repeat=1)["results"]
+    assert results["import reversi"]["import_us"] > 0
+    assert results["import reversi"]["modules"] > 1
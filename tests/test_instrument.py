@@ -0,0 +1,95 @@
+"""
+Tests for the engine instrumentation
+"""
+
+import pytest
+
+from reversi import Reversi, Board
+from bot import ReversiBot, SmartBot, VerySmartBot
+from instrument import instrument
+
+
+def test_counters():
+    """
+    Test the counters on a short sequence of known moves
+    """
+    game = Reversi(8, 2, True)
+    with instrument() as stats:
+        assert len(game.available_moves) == 4
+        game.apply_move((2, 3))
+        game.simulate_moves([(2, 2)])
+    assert stats.counters["moves_generated"] >= 4
+    #one flip for each move, including the simulated one
+    assert stats.counters["flips"] == 2
+    assert stats.counters["copies"] == 1
+    assert stats.counters["squares_scanned"] > 0
+    assert stats.counters["bot_nodes"] == 0
+    assert stats.timers["Reversi.apply_move"][0] == 2
+
+
+def test_squares_scanned_counts_only_scans():
+    """
+    Test that squares_scanned counts the squares visited by legal_move
+    and captures, but not other uses of Board.in_board
+    """
+    game = Reversi(8, 2, True)
+    with instrument() as stats:
+        for row in range(8):
+            for col in range(8):
+                game.piece_at((row, col))
+    assert stats.counters["squares_scanned"] == 0
+    with instrument() as stats:
+        game.legal_move((2, 3))
+    assert stats.counters["squares_scanned"] > 0
+
+
+def test_bot_nodes():
+    """
+    Test that SmartBot evaluates each legal move once
+    """
+    game = Reversi(8, 2, True)
+    with instrument() as stats:
+        SmartBot(game).suggest_move()
+    assert stats.counters["bot_nodes"] == 4
+    assert stats.timers["SmartBot.suggest_move"][0] == 1
+
+
+def test_bot_nodes_exclude_simulated_moves():
+    """
+    Test that the captures made by the moves VerySmartBot simulates
+    are not counted as nodes: only its own evaluations (each candidate
+    move, and each reply to it) are
+    """
+    game = Reversi(8, 2, True)
+    expected = sum(1 + len(game.simulate_moves([move]).available_moves)
+                   for move in game.available_moves)
+    with instrument() as stats:
+        VerySmartBot(game).suggest_move()
+    assert stats.counters["bot_nodes"] == expected
+    #the simulated moves count as flips instead (one for each opening)
+    assert stats.counters["flips"] == 4
+
+
+def test_methods_restored():
+    """
+    Test that the original methods are put back on exit, even after
+    an error, and that instrumentation cannot be nested
+    """
+    legal_move = Reversi.__dict__["legal_move"]
+    available_moves = Reversi.__dict__["available_moves"]
+    in_board = Board.__dict__["in_board"]
+    with pytest.raises(ValueError):
+        with instrument():
+            assert Reversi.__dict__["legal_move"] is not legal_move
+            with pytest.raises(RuntimeError):
+                with instrument():
+                    pass
+            raise ValueError
+    assert Reversi.__dict__["legal_move"] is legal_move
+    assert Reversi.__dict__["available_moves"] is available_moves
+    assert Board.__dict__["in_board"] is in_board
+
+    #the game still works normally
+    game = Reversi(8, 2, True)
+    ReversiBot(game).move("very-smart")
+    assert sum(square is not None for row in game.grid for square in row) == 5
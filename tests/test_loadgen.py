@@ -0,0 +1,32 @@
+"""
+Tests for the game server load generator
+"""
+
+import asyncio
+
+from server import GameServer
+from loadgen import run_load
+
+
+def test_run_load():
+    """
+    Test that a short load test against a local server plays games
+    and reports latencies for every command type
+    """
+    async def session():
+        server = GameServer(workers=1)
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve(port=0, ready=ready))
+        await ready.wait()
+        results = await run_load("127.0.0.1", server.port, clients=3,
+                                 duration=1.0, side=4, bot_fraction=0.3)
+        task.cancel()
+        return results
+
+    results = asyncio.run(session())
+    assert results["games"] > 0
+    assert {"move", "moves-list", "hint"} <= set(results["commands"])
+    for row in results["commands"].values():
+        assert row["p50_ms"] <= row["p99_ms"] <= row["p999_ms"] <= row["max_ms"]
+    assert results["requests"] == sum(row["count"]
+                                      for row in results["commands"].values())
@@ -0,0 +1,59 @@
+"""
+Performance budgets (see perf_budget in conftest.py)
+
+Budgets leave about 2.5 times the measured time and 4 times the
+measured peak memory, so they catch large slowdowns without failing
+on noise.
+"""
+
+import random
+
+import pytest
+
+from reversi import Reversi
+from bot import RandomBot, VerySmartBot
+
+pytestmark = pytest.mark.perf
+
+
+def play_random(game: Reversi, seed: int, plies: int = -1) -> Reversi:
+    """
+    Plays seeded random moves until the game is over, or for the
+    given number of plies
+    """
+    random.seed(seed)
+    bot = RandomBot(game)
+    while not game.done and plies != 0:
+        game.apply_move(bot.suggest_move())
+        plies -= 1
+    return game
+
+
+def test_random_game_8x8(perf_budget):
+    """
+    Test the budget of a full random 8x8 Othello game
+    """
+    perf_budget(lambda: play_random(Reversi(8, 2, True), 1),
+                units=5, peak_bytes=32_000)
+
+
+def test_very_smart_midgame_move(perf_budget):
+    """
+    Test the budget of one VerySmartBot move in the middle game
+    """
+    game = play_random(Reversi(8, 2, True), 2, plies=20)
+
+    def move():
+        random.seed(3)
+        return VerySmartBot(game).suggest_move()
+
+    perf_budget(move, units=2, peak_bytes=128_000)
+
+
+def test_random_game_21x21_9_players(perf_budget):
+    """
+    Test the budget of the first 120 moves of a 9-player game on a
+    21x21 board
+    """
+    perf_budget(lambda: play_random(Reversi(21, 9, False), 4, plies=120),
+                units=70, peak_bytes=64_000, rounds=1)
@@ -0,0 +1,39 @@
+"""
+Tests for perft
+"""
+
+import pytest
+
+from reversi import Reversi
+from perft import divide, perft
+
+
+@pytest.mark.parametrize("depth, nodes",
+                         [(0, 1), (1, 4), (2, 12), (3, 56), (4, 244),
+                          (5, 1396)])
+def test_perft_othello_start(depth, nodes):
+    """
+    Test the known node counts for the standard 8x8 Othello start
+    """
+    assert perft(Reversi(8, 2, True), depth) == nodes
+
+
+def test_divide_sums_to_perft():
+    """
+    Test that the divide counts add up to the perft count, with one
+    entry per legal move
+    """
+    game = Reversi(7, 3, False)
+    counts = divide(game, 3)
+    assert [move for move, _ in counts] == game.available_moves
+    assert sum(count for _, count in counts) == perft(game, 3)
+
+
+def test_perft_counts_finished_game_as_leaf():
+    """
+    Test that a finished game counts as a single leaf at any depth
+    """
+    game = Reversi(4, 2, True)
+    game.load_game(1, [[1, 1, 1, 1]] * 4)
+    assert game.done
+    assert perft(game, 3) == 1
@@ -0,0 +1,146 @@
+"""
+Tests for the position index
+"""
+
+import random
+
+import numpy as np
+from click.testing import CliRunner
+
+from reversi import Reversi
+from bot import RandomBot
+from records import write_games
+from position_index import NO_MOVE, PositionIndex, build_index, main
+from symmetry import to_canonical, transform_board
+
+
+def random_games(path, num_games):
+    """
+    Writes a file of random 6x6 Othello games
+
+    Returns: the moves of each game, as square indices
+    """
+    random.seed(0)
+    games = []
+    for _ in range(num_games):
+        game = Reversi(6, 2, True)
+        bot = RandomBot(game)
+        moves = []
+        while not game.done:
+            row, col = bot.suggest_move()
+            moves.append(row * 6 + col)
+            game.apply_move((row, col))
+        games.append(moves)
+    with open(path, "wb") as f:
+        write_games(f, [(6, 2, True, moves) for moves in games])
+    return games
+
+
+def test_index_matches_brute_force(tmp_path):
+    """
+    Test that the external sort (with many small runs and blocks)
+    produces a sorted index, and that lookups find exactly the games
+    that reached a position
+    """
+    games = random_games(tmp_path / "games.rvg", 30)
+    index = build_index(str(tmp_path / "games.rvg"), str(tmp_path / "index"),
+                        run_size=100, block_size=16)
+    assert len(index) == sum(len(moves) + 1 for moves in games)
+    assert np.all(index.hashes[:-1] <= index.hashes[1:])
+
+    start = Reversi(6, 2, True)
+    assert index.games_reaching(start) == [(k, 0) for k in range(30)]
+
+    #every game that started with the same two moves as game 0
+    first = [divmod(move, 6) for move in games[0][:2]]
+    expected = [(k, 2) for k, moves in enumerate(games)
+                if moves[:2] == games[0][:2]]
+    assert sorted(index.games_reaching(start.simulate_moves(first))) == \
+        expected
+
+    #final positions have no next move
+    final = start.simulate_moves([divmod(m, 6) for m in games[0]])
+    rows = index.lookup(final.position_hash())
+    assert (0, len(games[0])) in index.games_reaching(final)
+    assert NO_MOVE in index.moves[rows].tolist()
+
+    assert index.games_reaching(Reversi(6, 2, False)) == []
+
+
+def test_explore(tmp_path):
+    """
+    Test the opening explorer statistics against the games, and that
+    a reopened index gives the same answers
+    """
+    games = random_games(tmp_path / "games.rvg", 30)
+    build_index(str(tmp_path / "games.rvg"), str(tmp_path / "index"))
+    index = PositionIndex.open(str(tmp_path / "index"))
+    start = Reversi(6, 2, True)
+    stats = index.explore(start)
+    assert sum(count for _, count, _ in stats) == 30
+    counts = [count for _, count, _ in stats]
+    assert counts == sorted(counts, reverse=True)
+    for move, count, won in stats:
+        played = [moves for moves in games
+                  if divmod(moves[0], 6) == move]
+        assert count == len(played)
+        wins = 0
+        for moves in played:
+            final = start.simulate_moves([divmod(m, 6) for m in moves])
+            wins += 1 in final.outcome
+        assert won == wins
+
+
+def test_canonical_index(tmp_path):
+    """
+    Test that a canonical index finds the games that reached any
+    rotation or reflection of a position, with moves mapped to the
+    position queried
+    """
+    games = random_games(tmp_path / "games.rvg", 30)
+    plain = build_index(str(tmp_path / "games.rvg"), str(tmp_path / "plain"))
+    build_index(str(tmp_path / "games.rvg"), str(tmp_path / "index"),
+                canonical=True)
+    index = PositionIndex.open(str(tmp_path / "index"))
+    assert index.canonical and not plain.canonical
+    assert len(index) == len(plain)
+
+    position = Reversi(6, 2, True).simulate_moves(
+        [divmod(move, 6) for move in games[0][:3]])
+    images = []
+    for transform in range(8):
+        image = Reversi(6, 2, False)
+        image.load_encoded(position.turn,
+                           transform_board(position.encode(), 6, transform))
+        images.append(image)
+    reached = set()
+    for image in images:
+        reached.update(plain.games_reaching(image))
+    stats = {move: (count, won) for move, count, won in index.explore(position)}
+    assert sum(count for count, _ in stats.values()) == len(reached)
+    for transform, image in enumerate(images):
+        assert set(index.games_reaching(image)) == reached
+        assert {move: (count, won)
+                for move, count, won in index.explore(image)} == \
+            {to_canonical(move, 6, transform): value
+             for move, value in stats.items()}
+
+
+def test_query_command(tmp_path):
+    """
+    Test that the query command reports the games of a position, and
+    rejects moves that are not legal instead of querying a corrupt
+    position
+    """
+    games = random_games(tmp_path / "games.rvg", 10)
+    build_index(str(tmp_path / "games.rvg"), str(tmp_path / "index"))
+    row, col = divmod(games[0][0], 6)
+    result = CliRunner().invoke(main, ["query", str(tmp_path / "index"),
+                                       "-s", "6", "-m", f"{row},{col}"])
+    assert result.exit_code == 0, result.output
+    assert "games reached the position" in result.output
+
+    result = CliRunner().invoke(main, ["query", str(tmp_path / "index"),
+                                       "-s", "6", "-m", "0,0"])
+    assert result.exit_code != 0
+    assert "illegal move (0, 0)" in result.output
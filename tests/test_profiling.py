@@ -0,0 +1,74 @@
+"""
+Tests for the --profile option
+"""
+
+import pstats
+import time
+
+from click.testing import CliRunner
+
+from profiling import StackSampler, output_paths, profile
+from bot import main as bot_main
+
+
+def busy_loop(seconds: float) -> None:
+    """
+    Keeps the main thread busy
+    """
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_output_paths():
+    """
+    Test that a trailing .pstats is not doubled
+    """
+    assert output_paths("run") == ("run.pstats", "run.collapsed")
+    assert output_paths("run.pstats") == ("run.pstats", "run.collapsed")
+
+
+def test_sampler_records_main_thread():
+    """
+    Test that sampled stacks are root-first and end in the function
+    that is running
+    """
+    sampler = StackSampler(0.001)
+    sampler.start()
+    busy_loop(0.1)
+    sampler.stop()
+    stacks = [stack for stack in sampler.stacks
+              if stack.startswith("MainThread;")]
+    assert any(stack.endswith("test_profiling.py:busy_loop")
+               for stack in stacks)
+
+
+def test_profile_writes_both_files(tmp_path):
+    """
+    Test that profile writes a pstats file and collapsed stacks, and
+    does nothing without a path
+    """
+    with profile(None):
+        busy_loop(0.01)
+    assert not list(tmp_path.iterdir())
+
+    with profile(str(tmp_path / "run"), interval=0.001):
+        busy_loop(0.1)
+    stats = pstats.Stats(str(tmp_path / "run.pstats"))
+    assert any(func == "busy_loop" for _, _, func in stats.stats)
+    lines = (tmp_path / "run.collapsed").read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+
+def test_bot_command_profile(tmp_path):
+    """
+    Test the --profile option of the bot command
+    """
+    result = CliRunner().invoke(
+        bot_main, ["-n", "1", "--profile", str(tmp_path / "bot.pstats")])
+    assert result.exit_code == 0
+    assert (tmp_path / "bot.pstats").exists()
+    assert (tmp_path / "bot.collapsed").exists()
@@ -0,0 +1,86 @@
+"""
+Tests for the compact binary format
+"""
+
+import io
+
+import pytest
+
+import records
+from reversi import Reversi
+from records import pack_game, pack_position, read_games, read_positions, \
+    unpack_game, unpack_position, write_games, write_positions
+
+
+def test_position_round_trip():
+    """
+    Test that a position is packed in 4 bits per square and that
+    Reversi.from_bytes restores it
+    """
+    game = Reversi(7, 3, False)
+    for move in [(2, 2), (3, 3), (4, 4), (2, 3)]:
+        game.apply_move(move)
+    data = game.to_bytes()
+    assert len(data) == 3 + 25
+    assert data[:3] == bytes([7, 3, game.turn])
+    restored = Reversi.from_bytes(data)
+    assert restored.grid == game.grid
+    assert restored.turn == game.turn
+    assert unpack_position(data) == (7, 3, game.turn, game.encode())
+
+
+def test_position_errors():
+    """
+    Test that invalid positions are rejected
+    """
+    with pytest.raises(ValueError):
+        pack_position(8, 2, 1, bytes(63))
+    with pytest.raises(ValueError):
+        unpack_position(bytes([8, 2, 1]) + bytes(31))
+    for header in ([0, 2, 1], [8, 0, 1], [8, 16, 1], [8, 2, 0], [8, 2, 3]):
+        with pytest.raises(ValueError):
+            side = header[0]
+            unpack_position(bytes(header) + bytes((side * side + 1) // 2))
+
+
+def test_game_move_encoding():
+    """
+    Test that moves take one byte on small boards and a varint on
+    boards with more than 256 squares
+    """
+    small = pack_game(8, 2, True, [19, 18, 17])
+    assert small == bytes([8, 2, 1, 3, 19, 18, 17])
+    large = pack_game(20, 2, False, [5, 300])
+    assert large == bytes([20, 2, 0, 2, 5, 0xAC, 0x02])
+    assert unpack_game(large) == ((20, 2, False, [5, 300]), len(large))
+
+
+def test_streaming_round_trip(monkeypatch):
+    """
+    Test that records split across read chunks are read back intact
+    """
+    monkeypatch.setattr(records, "CHUNK_SIZE", 7)
+    games = [(8, 2, True, list(range(i % 60))) for i in range(100)] + \
+        [(20, 4, False, [i * 7 % 400 for i in range(150)])]
+    f = io.BytesIO()
+    assert write_games(f, iter(games)) == len(games)
+    f.seek(0)
+    assert list(read_games(f)) == games
+
+    positions = [(5, 3, 1 + i % 3, bytes([i % 4] * 25)) for i in range(50)]
+    f = io.BytesIO()
+    write_positions(f, positions)
+    f.seek(0)
+    assert list(read_positions(f)) == positions
+
+
+def test_streaming_errors():
+    """
+    Test that truncated files and files of the wrong kind are rejected
+    """
+    f = io.BytesIO()
+    write_games(f, [(8, 2, True, [19, 18])])
+    with pytest.raises(ValueError):
+        list(read_games(io.BytesIO(f.getvalue()[:-1])))
+    with pytest.raises(ValueError):
+        list(read_positions(io.BytesIO(f.getvalue())))
@@ -0,0 +1,95 @@
+"""
+Tests for the memory-mapped replay buffer
+"""
+
+import numpy as np
+from click.testing import CliRunner
+
+from reversi import Reversi
+from replay import ReplayBuffer, main, self_play
+
+
+def test_encode_matches_grid():
+    """
+    Test that Reversi.encode uses the same numbering as the grid property
+    """
+    game = Reversi(side=8, players=2, othello=True)
+    game.apply_move((2, 3))
+    encoded = np.frombuffer(game.encode(), dtype=np.uint8).reshape(8, 8)
+    for r, row in enumerate(game.grid):
+        for c, value in enumerate(row):
+            assert encoded[r][c] == (0 if value is None else value)
+
+
+def test_append_and_reopen(tmp_path):
+    """
+    Test that positions survive closing and reopening the buffer
+    """
+    game = Reversi(side=8, players=2, othello=True)
+    with ReplayBuffer(str(tmp_path), 8, 2, capacity=10) as buffer:
+        buffer.append_game(game, [(2, 3), (2, 2)])
+        assert len(buffer) == 2
+
+    buffer = ReplayBuffer.open(str(tmp_path))
+    assert len(buffer) == 2
+    assert bytes(buffer.positions[0].tobytes()) == game.encode()
+    turn, move, _, ply = buffer.meta[1]
+    assert (turn, move, ply) == (2, 2 * 8 + 2, 1)
+    buffer.close()
+
+
+def test_ring_buffer_overwrites_oldest(tmp_path):
+    """
+    Test that a full buffer overwrites its oldest positions
+    """
+    with ReplayBuffer(str(tmp_path), 4, 2, capacity=3) as buffer:
+        for ply in range(5):
+            buffer.append(bytes(16), 1, ply=ply)
+        assert len(buffer) == 3
+        assert sorted(buffer.meta[:, 3]) == [2, 3, 4]
+
+
+def test_sample_uniform(tmp_path):
+    """
+    Test uniform sampling returns rows from the filled part of the buffer
+    """
+    with ReplayBuffer(str(tmp_path), 8, 2, capacity=100) as buffer:
+        self_play(buffer, 2, "random", True)
+        rng = np.random.default_rng(0)
+        indices, positions, meta = buffer.sample(32, rng)
+        assert positions.shape == (32, 8, 8)
+        assert meta.shape == (32, 4)
+        assert indices.max() < len(buffer)
+
+
+def test_sample_prioritized(tmp_path):
+    """
+    Test that prioritized sampling follows the priorities
+    """
+    with ReplayBuffer(str(tmp_path), 4, 2, capacity=5) as buffer:
+        for ply in range(5):
+            buffer.append(bytes(16), 1, ply=ply, priority=0.0)
+        buffer.update_priority(3, 1.0)
+        indices, _, meta = buffer.sample_prioritized(20,
+                                                     np.random.default_rng(0))
+        assert set(indices) == {3}
+        assert set(meta[:, 3]) == {3}
+
+
+def test_command_checks_existing_buffer(tmp_path):
+    """
+    Test that the replay command creates a buffer, appends to it when
+    the options match, and rejects options that do not match it
+    """
+    path = str(tmp_path / "buffer")
+    runner = CliRunner()
+    result = runner.invoke(main, [path, "-g", "1", "-s", "6", "-c", "500"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(main, [path, "-g", "1"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(main, [path, "-g", "1", "-s", "8"])
+    assert result.exit_code != 0
+    assert "--board-size 6, not 8" in result.output
+    buffer = ReplayBuffer.open(path)
+    assert (buffer.side, buffer.capacity) == (6, 500)
+    buffer.close()
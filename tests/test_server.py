@@ -0,0 +1,132 @@
+"""
+Tests for the asyncio game server
+"""
+
+import asyncio
+import json
+
+from reversi import Reversi
+from server import MAX_SIDE, GameServer, GameSession
+
+
+def run_requests(requests, workers=1):
+    """
+    Starts a server, sends the requests over one connection and
+    returns the responses
+    """
+    async def session():
+        server = GameServer(workers=workers)
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve(port=0, ready=ready))
+        await ready.wait()
+        reader, writer = await asyncio.open_connection("127.0.0.1",
+                                                       server.port)
+        responses = []
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        task.cancel()
+        return responses
+
+    return asyncio.run(session())
+
+
+def test_new_move_and_grid_delta():
+    """
+    Test creating a game, applying a move and querying changes
+    """
+    responses = run_requests([
+        {"cmd": "new", "side": 8, "players": 2, "othello": True, "id": 7},
+        {"cmd": "moves", "game": 1},
+        {"cmd": "move", "game": 1, "pos": [2, 3]},
+        {"cmd": "grid", "game": 1, "since": 0},
+        {"cmd": "move", "game": 1, "pos": [0, 0]},
+    ])
+    new, moves, move, delta, illegal = responses
+    assert new["ok"] and new["id"] == 7 and new["game"] == 1
+    assert new["grid"] == Reversi(8, 2, True).grid
+    assert sorted(map(tuple, moves["moves"])) == [(2, 3), (3, 2), (4, 5),
+                                                  (5, 4)]
+    assert sorted(map(tuple, move["changes"])) == [(2, 3, 1), (3, 3, 1)]
+    assert move["turn"] == 2 and move["version"] == 1
+    assert delta["changes"] == move["changes"]
+    assert not illegal["ok"]
+
+
+def test_bot_moves_until_done():
+    """
+    Test that bot moves computed in the process pool finish a game
+    """
+    requests = [{"cmd": "new", "side": 4, "players": 2, "othello": True}]
+    requests += [{"cmd": "bot", "game": 1, "strategy": "smart"}] * 12
+    responses = run_requests(requests)
+    finished = [r for r in responses[1:] if r["ok"] and r["done"]]
+    assert len(finished) == 1
+    assert finished[0]["outcome"]
+
+
+def test_errors():
+    """
+    Test that invalid requests get error responses
+    """
+    responses = run_requests([
+        {"cmd": "moves", "game": 5},
+        {"cmd": "dance"},
+        {"cmd": "new", "side": 8, "players": 3},
+        {"cmd": "new", "side": 10_000, "players": 2},
+        {"cmd": "moves", "game": [1]},
+        {"cmd": "moves", "game": "1"},
+    ])
+    assert not any(r["ok"] for r in responses)
+    assert responses[3]["error"] == "side must be at most 64"
+    assert responses[4]["error"] == responses[5]["error"] == \
+        "game must be an integer"
+
+
+def test_engine_calls_do_not_block_the_loop():
+    """
+    Test that concurrent moves requests on the largest board run in
+    the worker processes: a stats request sent after them is answered
+    first, and each moves request gets the legal moves
+    """
+    async def session():
+        server = GameServer(workers=1)
+        try:
+            new = await server.handle_request(
+                {"cmd": "new", "side": MAX_SIDE, "players": 2})
+            assert new["ok"]
+            done = []
+
+            async def request(name, body):
+                response = await server.handle_request(body)
+                done.append(name)
+                return response
+
+            tasks = [asyncio.create_task(request(
+                "moves", {"cmd": "moves", "game": new["game"]}))
+                     for _ in range(4)]
+            tasks.append(asyncio.create_task(request("stats",
+                                                     {"cmd": "stats"})))
+            responses = await asyncio.gather(*tasks)
+        finally:
+            server.close()
+        return done, responses
+
+    done, responses = asyncio.run(session())
+    assert done[0] == "stats"
+    expected = Reversi(MAX_SIDE, 2, True).available_moves
+    for response in responses[:4]:
+        assert response["ok"]
+        assert [tuple(move) for move in response["moves"]] == expected
+
+
+def test_session_is_compact():
+    """
+    Test that idle games are not stored as Reversi objects
+    """
+    session = GameSession(Reversi(8, 2, True), True)
+    assert not hasattr(session, "__dict__")
+    assert len(session.board) == 64
+    assert session.load().grid == Reversi(8, 2, True).grid
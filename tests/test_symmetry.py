@@ -0,0 +1,72 @@
+"""
+Tests for the symmetries of the board
+"""
+
+import random
+
+from reversi import Reversi
+from bot import RandomBot
+from symmetry import canonicalize, from_canonical, to_canonical, \
+    transform_board
+
+
+def random_position(side, players, plies, seed):
+    """
+    Returns: a game after some random moves
+    """
+    random.seed(seed)
+    game = Reversi(side, players, players == 2)
+    bot = RandomBot(game)
+    for _ in range(plies):
+        game.apply_move(bot.suggest_move())
+    return game
+
+
+def test_transforms_preserve_moves():
+    """
+    Test that every transform maps the legal moves of a position to the
+    legal moves of its image, and that moves map back
+    """
+    for side, players in ((6, 2), (7, 3), (8, 2)):
+        game = random_position(side, players, 6, side)
+        for transform in range(8):
+            image = Reversi(side, players, False)
+            image.load_encoded(game.turn,
+                               transform_board(game.encode(), side, transform))
+            assert sorted(to_canonical(move, side, transform)
+                          for move in game.available_moves) == \
+                sorted(image.available_moves)
+            for move in game.available_moves:
+                assert from_canonical(to_canonical(move, side, transform),
+                                      side, transform) == move
+
+
+def test_transforms_are_distinct():
+    """
+    Test that the 8 transforms give 8 different images of an
+    asymmetric board
+    """
+    board = bytes(range(64))
+    assert len({transform_board(board, 8, t) for t in range(8)}) == 8
+
+
+def test_canonicalize():
+    """
+    Test that all images of a position have the same canonical form,
+    the smallest of the images, and that the transform maps the
+    position to it
+    """
+    game = random_position(8, 2, 10, 0)
+    board = game.encode()
+    canonical, transform = canonicalize(board, 8)
+    assert canonical == min(transform_board(board, 8, t) for t in range(8))
+    assert transform_board(board, 8, transform) == canonical
+    for t in range(8):
+        image = transform_board(board, 8, t)
+        image_canonical, image_transform = canonicalize(image, 8)
+        assert image_canonical == canonical
+        assert transform_board(image, 8, image_transform) == canonical
+
+    #the start position is symmetric under a half-turn
+    start = Reversi(8, 2, True).encode()
+    assert transform_board(start, 8, 2) == start
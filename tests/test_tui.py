@@ -0,0 +1,109 @@
+"""
+Tests for the terminal interface
+"""
+
+from click.testing import CliRunner
+
+from reversi import Reversi
+from tui import HintSearch, Renderer, run_game, spectate_game
+
+
+def test_plain_renderer_prints_board(capsys):
+    """
+    Test that the plain renderer prints the whole board every time
+    """
+    game = Reversi(8, 2, True)
+    renderer = Renderer(game, False)
+    renderer.draw()
+    renderer.draw()
+    assert capsys.readouterr().out == f"{game}\n{game}\n"
+
+
+def test_ansi_renderer_redraws_changed_squares(capsys):
+    """
+    Test that, after the first draw, the ANSI renderer only redraws
+    the squares changed by a move, and reprints pending messages
+    """
+    game = Reversi(8, 2, True)
+    renderer = Renderer(game, True, lines=24)
+    renderer.draw()
+    first = capsys.readouterr().out
+    assert first.startswith("\x1b[2J\x1b[H")
+    #the text below the board scrolls on its own, so it never moves
+    # the board
+    assert "\x1b[18;24r" in first
+    assert first.count("\x1b[") == 2 + 1 + 4 + 2
+
+    game.apply_move((2, 3))
+    renderer.say("Player 1 makes the move 2, 3.")
+    capsys.readouterr()
+    renderer.draw()
+    out = capsys.readouterr().out
+    #the new piece and the flipped piece
+    assert "\x1b[6;8H" in out
+    assert "\x1b[8;8H" in out
+    assert out.count("\x1b[") == 2 + 2
+    assert out.endswith("\x1b[18;1H\x1b[JPlayer 1 makes the move 2, 3.\n")
+
+    renderer.close()
+    assert capsys.readouterr().out == "\x1b7\x1b[r\x1b8"
+
+
+def test_hint_search_runs_on_a_copy():
+    """
+    Test that the background hint is a legal move, and that moving
+    while the search runs does not affect it
+    """
+    game = Reversi(8, 2, True)
+    search = HintSearch(game)
+    move = search.hint()
+    assert move in game.available_moves
+    search.cancel()
+    game.apply_move(move)
+    assert search.hint() in Reversi(8, 2, True).available_moves
+
+
+def test_spectate_headless_prints_move_list(capsys):
+    """
+    Test that headless spectating prints one line per move and that
+    the moves replay to the final position
+    """
+    game = Reversi(7, 3, False)
+    renderer = Renderer(game, False)
+    moves = spectate_game(game, ["random", "smart"], renderer,
+                          headless=True)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == len(moves)
+    assert game.done
+    assert [player for player, _, _ in moves][:3] == [1, 2, 3]
+    replay = Reversi(7, 3, False).simulate_moves(
+        [(i, j) for _, i, j in moves])
+    assert replay.grid == game.grid
+
+
+def test_spectate_fast_forward_draws_every_nth(capsys):
+    """
+    Test that fast-forward only draws every Nth position and the
+    final board
+    """
+    game = Reversi(8, 2, True)
+    renderer = Renderer(game, False)
+    moves = spectate_game(game, ["random"], renderer, every=10)
+    boards = capsys.readouterr().out.count("┌")
+    assert boards == (len(moves) - 1) // 10 + 1
+
+    game = Reversi(8, 2, True)
+    renderer = Renderer(game, False)
+    spectate_game(game, ["random"], renderer, every=0)
+    assert capsys.readouterr().out.count("┌") == 1
+
+
+def test_fast_forward_rejects_delay():
+    """
+    Test that --delay and --fast-forward cannot be combined
+    """
+    result = CliRunner().invoke(run_game, ["--spectate", "random",
+                                           "--fast-forward", "5",
+                                           "--delay", "1", "--headless"])
+    assert result.exit_code != 0
+    assert "--delay cannot be used with --fast-forward" in result.output
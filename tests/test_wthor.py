@@ -0,0 +1,109 @@
+"""
+Tests for the WTHOR importer
+"""
+
+import random
+import struct
+
+import pytest
+from click.testing import CliRunner
+
+from reversi import Reversi
+from bot import RandomBot
+from records import read_games, read_positions
+from wthor import import_file, main, parse
+
+
+def wthor_file(path, num_games, illegal=()):
+    """
+    Writes a WTHOR file of random games, making the sixth move of the
+    given games illegal
+
+    Returns: the moves of each game, as (row, col) pairs
+    """
+    random.seed(0)
+    games = []
+    records = []
+    for k in range(num_games):
+        game = Reversi(8, 2, True)
+        bot = RandomBot(game)
+        moves = []
+        while not game.done:
+            moves.append(bot.suggest_move())
+            game.apply_move(moves[-1])
+        codes = [10 * (row + 1) + col + 1 for row, col in moves]
+        if k in illegal:
+            codes[5] = codes[0]
+        games.append(moves)
+        records.append(struct.pack("<HHHBB60s", 1, 2, 3, 32, 32,
+                                   bytes(codes)))
+    header = struct.pack("<4sIHHBBBB", b"\x14\x18\x01\x01", num_games, 0,
+                         2024, 0, 0, 0, 0)
+    path.write_bytes(header + b"".join(records))
+    return games
+
+
+def test_parse(tmp_path):
+    """
+    Test that moves are converted to square indices, and that a range
+    of games can be parsed
+    """
+    games = wthor_file(tmp_path / "games.wtb", 3)
+    data = (tmp_path / "games.wtb").read_bytes()
+    parsed = list(parse(data))
+    assert [list(moves) for moves in parsed] == \
+        [[row * 8 + col for row, col in moves] for moves in games]
+    assert list(parse(data, 1, 1)) == parsed[1:2]
+
+
+def test_import_file_rejects_illegal_games(tmp_path):
+    """
+    Test that games with an illegal move are rejected, and that
+    positions are recorded before each move
+    """
+    games = wthor_file(tmp_path / "games.wtb", 4, illegal=(1,))
+    records, positions, rejected = import_file(str(tmp_path / "games.wtb"),
+                                               True)
+    assert rejected == 1
+    assert len(records) == 3
+    assert records[0] == (8, 2, True, [row * 8 + col
+                                       for row, col in games[0]])
+    assert len(positions) == sum(len(games[k]) for k in (0, 2, 3))
+    assert positions[0] == (8, 2, 1, Reversi(8, 2, True).encode())
+
+
+def test_import_file_reads_only_its_chunk(tmp_path):
+    """
+    Test that a chunk of games is imported from its own records, so a
+    truncated end of the file only affects the chunk that reaches it
+    """
+    path = tmp_path / "games.wtb"
+    wthor_file(path, 4)
+    everything, _, _ = import_file(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    first, _, _ = import_file(str(path), first=0, count=2)
+    assert first == everything[:2]
+    with pytest.raises(ValueError):
+        import_file(str(path), first=2, count=2)
+
+
+def test_command(tmp_path):
+    """
+    Test the wthor command on two files split into chunks
+    """
+    wthor_file(tmp_path / "a.wtb", 3)
+    wthor_file(tmp_path / "b.wtb", 2, illegal=(0,))
+    result = CliRunner().invoke(main, [
+        str(tmp_path / "a.wtb"), str(tmp_path / "b.wtb"),
+        "-o", str(tmp_path / "games.rvg"),
+        "--positions", str(tmp_path / "positions.rvp"),
+        "-j", "1", "--chunk-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Imported 4 games from 2 files (1 rejected)" in result.output
+    with open(tmp_path / "games.rvg", "rb") as f:
+        records = list(read_games(f))
+    with open(tmp_path / "positions.rvp", "rb") as f:
+        positions = list(read_positions(f))
+    assert len(records) == 4
+    assert len(positions) == sum(len(moves) for *_, moves in records)